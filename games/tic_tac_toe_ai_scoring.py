@@ -5,12 +5,16 @@ import time
 import os
 import json
 import math
+import threading
+import sqlite3
+from tic_tac_toe_engine import TicTacToeEngine, mcts_available
 
 """
 Enhanced Tic-Tac-Toe with:
  - Undo/Redo support
  - Improved AI (memoization, variable depth, and a simple learning AI)
  - Additional board sizes (3x3, 4x4, 5x5)
+ - Headless engine (tic_tac_toe_engine.py) holding the rules and AI; this file is the pygame client
  - Hint system
  - In-game Help Screen
  - Enhanced Animations (fade transitions, animated move placements, and particle effects)
@@ -53,6 +57,10 @@ DARK_THEME = {
     'hint': (255, 69, 0)
 }
 
+# Hint heatmap cell colors by result; undecided moves are shaded between loss and win by score
+HEATMAP_COLORS = {'win': (0, 180, 0), 'draw': (220, 180, 0), 'loss': (200, 0, 0)}
+HEATMAP_ALPHA = 90
+
 # Define fonts
 FONT = pygame.font.SysFont('Arial', 24)
 SCORE_FONT = pygame.font.SysFont('Arial', 16)
@@ -68,6 +76,19 @@ LEADERBOARD = 'leaderboard'
 HELP = 'help'
 SELECT_MODE = 'select_mode'
 
+# Posted by the AI worker thread when its search finishes
+AI_MOVE_EVENT = pygame.USEREVENT + 1
+# Posted by the hint worker thread when its analysis finishes
+HINT_EVENT = pygame.USEREVENT + 2
+
+# Turn scheduler states: nothing scheduled, AI search due, search running, AI move waiting to be played
+TURN_IDLE = 'idle'
+TURN_SEARCH = 'search'
+TURN_THINKING = 'thinking'
+TURN_READY = 'ready'
+# Choices for the minimum time between moves in AI vs AI, in ms
+AI_VS_AI_PACES = {'Fast': 200, 'Normal': 600, 'Slow': 1500}
+
 # --- Helper Functions for Animations ---
 def fade(screen, color, duration=500):
     """Fade to a solid color over duration (ms)"""
@@ -138,14 +159,10 @@ class InputBox:
         self.color = self.color_active if self.active else self.color_inactive
         self.txt_surface = FONT.render(self.text, True, self.color)
 
-class TicTacToe:
+class TicTacToe(TicTacToeEngine):
     def __init__(self):
-        # Game configuration
-        self.board_size = 3  # 3x3 board
-        self.win_length = self.board_size
-        self.misere_mode = False
-        self.board = [''] * (self.board_size * self.board_size)
-        self.current_player = 'X'
+        # Rules, board state and AI configuration live in the engine
+        TicTacToeEngine.__init__(self, board_size=3)
         self.player_score = 0
         self.ai_score = 0
         self.player_wins = 0
@@ -153,12 +170,6 @@ class TicTacToe:
         self.ties = 0
         self.total_games = 0
 
-        # AI configuration
-        self.difficulty = 'Easy'
-        self.ai_depth = 9
-        self.ai_personality = 'Balanced'
-        self.learning_table = {}
-
         # Game mode
         self.game_mode = 'Player vs AI'
         
@@ -173,15 +184,28 @@ class TicTacToe:
         self.cell_size = WINDOW_SIZE // self.board_size
         self.update_grid_lines()
 
-        # Undo/Redo tracking
-        self.move_history = []
-        self.redo_history = []
-
-        self.last_move = None
         self.hint_index = None
-
-        # Memoization for minimax
-        self.memoization = {}
+        # Expected continuation after the hint move, drawn as small move numbers
+        self.hint_line = []
+        # Every move's analysis from the last hint, drawn as a heatmap
+        self.hint_analysis = []
+        # Background hint analysis; results for an older token are for a position no longer shown
+        self.hint_token = 0
+        self.hint_engine = None
+
+        # AI turns are scheduled here and advanced one step per frame by update_turns()
+        self.turn_state = TURN_IDLE
+        self.next_turn_at = 0
+        self.pending_ai_move = None
+        self.ai_vs_ai_pace = 'Normal'
+
+        # Background AI search
+        self.ai_thinking_since = 0
+        self.ai_search_token = 0
+        self.ai_search_engine = None
+        # Search on the player's time in Player vs AI, so the AI can answer instantly
+        self.pondering_enabled = True
+        self.ponder_engine = None
 
         # Game state
         self.state = MENU
@@ -196,6 +220,10 @@ class TicTacToe:
         self.save_file = 'scores.json'
         self.leaderboard_file = 'leaderboard.json'
         self.theme_file = 'theme.json'
+        # Search results kept across games and sessions, next to the scores
+        self.search_cache_file = os.path.join(os.path.dirname(self.save_file), 'search_cache.db')
+        # What the Learning personality learns from these games is saved there too
+        self.learning_dir = os.path.dirname(self.save_file)
         
         # New data attributes:
         self.profiles = {}      # holds profiles (multiple user data + game history)
@@ -219,8 +247,7 @@ class TicTacToe:
         self.load_leaderboard()
         self.load_theme()
         self.update_theme()
-
-        self.main_loop()
+        self.set_search_cache(True)
 
     # ===== Data Persistence Methods =====
 
@@ -278,8 +305,10 @@ class TicTacToe:
         profile["total_games"] = self.total_games
         game_record = {
             "date": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "result": result
-            # You could add additional details (e.g., moves history) here if desired.
+            "result": result,
+            "board_size": self.board_size,
+            # One byte per move (see TicTacToeEngine.game_record), stored as hex
+            "moves": self.game_record().hex()
         }
         profile["game_history"].append(game_record)
         self.profiles[self.profile_name] = profile
@@ -318,6 +347,17 @@ class TicTacToe:
         self.leaderboard.sort(key=lambda x: x["score"], reverse=True)
         self.save_leaderboard()
 
+    def set_search_cache(self, enabled):
+        """Open (or stop using) the persistent search cache in search_cache_file."""
+        self.search_cache = None
+        if not enabled:
+            return
+        from tic_tac_toe_cache import search_cache
+        try:
+            self.search_cache = search_cache(self.search_cache_file)
+        except sqlite3.Error as e:
+            print("Error opening search cache:", e)
+
     # ===== End Data Persistence Methods =====
 
     # ===== Sound, Theme, and Other Methods (unchanged from previous version) =====
@@ -349,6 +389,7 @@ class TicTacToe:
     def main_loop(self):
         while self.running:
             self.handle_events()
+            self.update_turns()
             self.draw()
             pygame.display.update()
             self.clock.tick(self.FPS)
@@ -359,11 +400,17 @@ class TicTacToe:
                 self.save_profiles()
                 self.save_leaderboard()
                 self.save_theme()
+                self.save_learning()
+                self.cancel_ai_search()
                 self.running = False
                 pygame.quit()
                 sys.exit()
             elif event.type == pygame.VIDEORESIZE:
                 self.handle_window_resize(event.w, event.h)
+            elif event.type == AI_MOVE_EVENT:
+                self.handle_ai_move_event(event)
+            elif event.type == HINT_EVENT:
+                self.handle_hint_event(event)
             if self.state == MENU:
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     self.handle_menu_click(event.pos)
@@ -383,18 +430,25 @@ class TicTacToe:
                     elif event.key == pygame.K_r:
                         self.reset_board()
                     elif event.key == pygame.K_ESCAPE:
+                        self.cancel_ai_search()
                         self.state = MENU
                     elif event.key == pygame.K_u:
+                        self.cancel_ai_search()
                         self.undo_move()
                     elif event.key == pygame.K_y:
                         self.redo_move()
+                    elif event.key == pygame.K_HOME:
+                        self.jump_to_move(0)
+                    elif event.key == pygame.K_END:
+                        self.jump_to_move(len(self.move_log) + len(self.redo_log))
                     elif event.key == pygame.K_i:
-                        self.hint_index = self.get_hint_move()
+                        self.show_hint()
             elif self.state == PAUSE:
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_p:
                         self.state = GAME
                     elif event.key == pygame.K_ESCAPE:
+                        self.cancel_ai_search()
                         self.state = MENU
             elif self.state == SETTINGS:
                 result = self.input_box.handle_event(event)
@@ -464,6 +518,7 @@ class TicTacToe:
 
     def handle_back_button(self, pos):
         if self.back_button_rect.collidepoint(pos):
+            self.cancel_ai_search()
             self.state = MENU
             self.play_sound(self.button_click_sound)
 
@@ -496,6 +551,7 @@ class TicTacToe:
             self.save_profiles()
             self.save_leaderboard()
             self.save_theme()
+            self.save_learning()
             pygame.quit()
             sys.exit()
 
@@ -513,10 +569,20 @@ class TicTacToe:
                 elif action == 'set_ai_personality':
                     self.set_ai_personality(value)
                 elif action == 'set_board_size':
-                    self.set_board_size(value)
+                    self.set_board_size(*value)
                 elif action == 'toggle_misere':
                     self.misere_mode = not self.misere_mode
                     self.show_message(f"Misère Mode {'On' if self.misere_mode else 'Off'}")
+                elif action == 'toggle_pondering':
+                    self.pondering_enabled = not self.pondering_enabled
+                    self.show_message(f"Pondering {'On' if self.pondering_enabled else 'Off'}")
+                elif action == 'cycle_ai_pace':
+                    paces = list(AI_VS_AI_PACES)
+                    self.ai_vs_ai_pace = paces[(paces.index(self.ai_vs_ai_pace) + 1) % len(paces)]
+                    self.show_message(f"AI vs AI Pace {self.ai_vs_ai_pace}")
+                elif action == 'toggle_search_cache':
+                    self.set_search_cache(self.search_cache is None)
+                    self.show_message(f"Search Cache {'On' if self.search_cache is not None else 'Off'}")
                 if self.previous_state == GAME_OVER:
                     self.reset_board()
                     self.state = GAME
@@ -558,7 +624,7 @@ class TicTacToe:
         row = y // self.cell_size
         col = x // self.cell_size
         index = row * self.board_size + col
-        if 0 <= index < len(self.board) and self.board[index] == '':
+        if self.turn_state == TURN_IDLE and 0 <= index < len(self.board) and self.board[index] == '':
             self.make_move(index)
             self.play_sound(self.move_sound)
         self.handle_back_button(pos)
@@ -566,12 +632,12 @@ class TicTacToe:
 
     def make_move(self, index):
         if self.board[index] == '':
-            self.move_history.append((self.board.copy(), self.current_player))
-            self.redo_history.clear()
-            self.board[index] = self.current_player
-            self.last_move = index
+            self.stop_pondering()
+            self.cancel_hint()
+            self.redo_log.clear()
+            self.place(index)
             self.animate_move(index)
-            if self.check_winner(self.board, self.current_player):
+            if self.last_move_wins():
                 # Update current profile stats before leaderboard update.
                 self.total_games += 1
                 if self.current_player == 'X':
@@ -580,17 +646,17 @@ class TicTacToe:
                     self.ai_wins += 1
                 self.update_current_profile("win" if self.current_player=='X' else "loss")
                 self.handle_win(self.current_player)
-            elif '' not in self.board:
+            elif self.is_full():
                 self.total_games += 1
                 self.ties += 1
                 self.update_current_profile("tie")
                 self.handle_tie()
             else:
                 self.switch_turns()
-                if self.game_mode == 'Player vs AI' and self.current_player == 'O':
-                    self.ai_move()
-                elif self.game_mode == 'AI vs AI':
-                    self.ai_move()
+                if self.ai_to_move():
+                    self.schedule_ai_turn()
+                elif self.game_mode == 'Player vs AI':
+                    self.start_pondering()
 
     def animate_move(self, index):
         x = (index % self.board_size) * self.cell_size
@@ -616,170 +682,168 @@ class TicTacToe:
             pygame.display.update()
             pygame.time.delay(20)
 
+    def game_moves(self):
+        """Move indices of the game so far, in order."""
+        return [index for index, _ in self.move_log]
+
     def undo_move(self):
-        if self.move_history:
-            self.redo_history.append((self.board.copy(), self.current_player))
-            state = self.move_history.pop()
-            self.board, self.current_player = state
-            self.last_move = None
+        if self.undo():
             self.show_message("Undo performed")
         else:
             self.show_message("Nothing to undo!")
 
     def redo_move(self):
-        if self.redo_history:
-            self.move_history.append((self.board.copy(), self.current_player))
-            state = self.redo_history.pop()
-            self.board, self.current_player = state
-            self.last_move = None
+        self.cancel_hint()
+        if self.redo():
             self.show_message("Redo performed")
         else:
             self.show_message("Nothing to redo!")
 
-    def switch_player(self, player):
-        return 'O' if player == 'X' else 'X'
+    def show_hint(self):
+        """Analyse every move on a worker thread: best move, its expected line and a heatmap of the rest."""
+        if not self.empty_indices():
+            return
+        # Pondering would compete with the analysis for the CPU and the shared tables
+        self.stop_pondering()
+        self.cancel_hint()
+        self.hint_engine = self.snapshot()
+        threading.Thread(target=self.run_hint_analysis, args=(self.hint_engine, self.hint_token), daemon=True).start()
+
+    def run_hint_analysis(self, engine, token):
+        """Worker thread body: analyse a snapshot of the game and post the result back."""
+        error = None
+        try:
+            analysis = [] if engine.stop_requested else engine.analyze_moves()
+        except Exception as e:
+            print("Error during hint analysis:", repr(e))
+            analysis = []
+            error = str(e) or type(e).__name__
+        pygame.event.post(pygame.event.Event(HINT_EVENT, analysis=analysis, token=token, error=error))
+
+    def cancel_hint(self):
+        """Abort a running hint analysis; its result is ignored when it arrives."""
+        if self.hint_engine is not None:
+            self.hint_engine.request_stop()
+            self.hint_engine = None
+        self.hint_token += 1
+
+    def handle_hint_event(self, event):
+        if event.token != self.hint_token:
+            return
+        self.hint_engine = None
+        if event.error is not None:
+            self.show_message("Hint unavailable")
+        self.hint_analysis = event.analysis
+        if self.hint_analysis:
+            self.hint_index = self.hint_analysis[0]['move']
+            self.hint_line = self.hint_analysis[0]['pv']
+        else:
+            self.hint_index = None
+            self.hint_line = []
+        if self.game_mode == 'Player vs AI' and not self.ai_to_move():
+            self.start_pondering()
+
+    def jump_to_move(self, ply):
+        """Show the game as it stood after ply moves; undone moves stay available to redo."""
+        self.cancel_ai_search()
+        self.jump_to_ply(ply)
+        self.hint_index = None
 
-    def switch_turns(self):
-        self.current_player = self.switch_player(self.current_player)
+    def snapshot(self):
+        """Engine copy for a worker thread. It always searches in this process: forking the
+        parallel search's pool from a process that runs threads can deadlock the workers,
+        so root-parallel search (search_workers) is left to headless callers and not offered here."""
+        engine = TicTacToeEngine.snapshot(self)
+        engine.search_workers = 1
+        return engine
 
-    def ai_move(self):
-        pygame.time.wait(self.animation_speed)
-        empty_indices = [i for i, x in enumerate(self.board) if x == '']
-        if not empty_indices:
+    def ai_to_move(self):
+        return self.game_mode == 'AI vs AI' or (self.game_mode == 'Player vs AI' and self.current_player == 'O')
+
+    def schedule_ai_turn(self):
+        """Let update_turns() play the AI's move, no sooner than the pace allows."""
+        pace = AI_VS_AI_PACES[self.ai_vs_ai_pace] if self.game_mode == 'AI vs AI' else self.animation_speed
+        self.turn_state = TURN_SEARCH
+        self.next_turn_at = pygame.time.get_ticks() + pace
+
+    def update_turns(self):
+        """
+        Advance the turn scheduler by one step; called once per frame from main_loop, so at
+        most one AI move is played per tick and input is handled between moves. The search
+        starts at once, and its move is played when both it and the pace allow.
+        """
+        if self.state != GAME:
             return
+        if self.turn_state == TURN_SEARCH:
+            self.ai_move()
+        elif self.turn_state == TURN_READY and pygame.time.get_ticks() >= self.next_turn_at:
+            index = self.pending_ai_move
+            self.turn_state = TURN_IDLE
+            self.pending_ai_move = None
+            self.make_move(index)
 
-        if self.difficulty == 'Easy':
-            index = random.choice(empty_indices)
-        elif self.difficulty == 'Medium':
-            index = self.block_player(empty_indices)
-        else:
-            if self.ai_personality == 'Aggressive':
-                index = self.aggressive_move(empty_indices)
-            elif self.ai_personality == 'Defensive':
-                index = self.defensive_move(empty_indices)
-            elif self.ai_personality == 'Learning':
-                index = self.learning_move(empty_indices)
-            else:
-                index = self.minimax_ai()
-        self.make_move(index)
-        if self.game_mode == 'AI vs AI':
-            pygame.time.wait(500)
-
-    def aggressive_move(self, empty_indices):
-        for index in empty_indices:
-            self.board[index] = self.current_player
-            if self.check_winner(self.board, self.current_player):
-                self.board[index] = ''
-                return index
-            self.board[index] = ''
-        return random.choice(empty_indices)
-
-    def defensive_move(self, empty_indices):
-        opponent = self.switch_player(self.current_player)
-        for index in empty_indices:
-            self.board[index] = opponent
-            if self.check_winner(self.board, opponent):
-                self.board[index] = ''
-                return index
-            self.board[index] = ''
-        return random.choice(empty_indices)
-
-    def block_player(self, empty_indices):
-        for index in empty_indices:
-            self.board[index] = self.current_player
-            if self.check_winner(self.board, self.current_player):
-                self.board[index] = ''
-                return index
-            self.board[index] = ''
-        opponent = self.switch_player(self.current_player)
-        for index in empty_indices:
-            self.board[index] = opponent
-            if self.check_winner(self.board, opponent):
-                self.board[index] = ''
-                return index
-            self.board[index] = ''
-        if 4 in empty_indices:
-            return 4
-        return random.choice(empty_indices)
-
-    def minimax_ai(self):
-        best_score = -float('inf')
-        best_move = None
-        for i in range(len(self.board)):
-            if self.board[i] == '':
-                self.board[i] = self.current_player
-                score = self.minimax(self.board, self.switch_player(self.current_player), False, self.ai_depth)
-                self.board[i] = ''
-                if score > best_score:
-                    best_score = score
-                    best_move = i
-        return best_move
-
-    def minimax(self, board, player, is_maximizing, depth, alpha=-float('inf'), beta=float('inf')):
-        board_key = tuple(board)
-        if (board_key, player, is_maximizing, depth) in self.memoization:
-            return self.memoization[(board_key, player, is_maximizing, depth)]
-
-        opponent = self.switch_player(player)
-        if self.check_winner(board, opponent):
-            score = 1 if opponent == self.current_player else -1
-            self.memoization[(board_key, player, is_maximizing, depth)] = score
-            return score
-        elif '' not in board or depth == 0:
-            return 0
-
-        if is_maximizing:
-            max_eval = -float('inf')
-            for i in range(len(board)):
-                if board[i] == '':
-                    board[i] = player
-                    eval = self.minimax(board, self.switch_player(player), False, depth - 1, alpha, beta)
-                    board[i] = ''
-                    max_eval = max(max_eval, eval)
-                    alpha = max(alpha, eval)
-                    if beta <= alpha:
-                        break
-            self.memoization[(board_key, player, is_maximizing, depth)] = max_eval
-            return max_eval
-        else:
-            min_eval = float('inf')
-            for i in range(len(board)):
-                if board[i] == '':
-                    board[i] = player
-                    eval = self.minimax(board, self.switch_player(player), True, depth - 1, alpha, beta)
-                    board[i] = ''
-                    min_eval = min(min_eval, eval)
-                    beta = min(beta, eval)
-                    if beta <= alpha:
-                        break
-            self.memoization[(board_key, player, is_maximizing, depth)] = min_eval
-            return min_eval
-
-    def learning_move(self, empty_indices):
-        board_key = tuple(self.board)
-        if board_key in self.learning_table:
-            moves = self.learning_table[board_key]
-            available_moves = {move: wins for move, wins in moves.items() if move in empty_indices}
-            if available_moves:
-                return max(available_moves, key=available_moves.get)
-        return self.minimax_ai()
-
-    def check_winner(self, board, player):
-        n = self.board_size
-        win = False
-        for i in range(n):
-            if all(board[i*n + j] == player for j in range(n)):
-                win = True
-            if all(board[j*n + i] == player for j in range(n)):
-                win = True
-        if all(board[i*n + i] == player for i in range(n)):
-            win = True
-        if all(board[i*n + (n - 1 - i)] == player for i in range(n)):
-            win = True
-        if self.misere_mode:
-            return not win and any(board[i] != '' for i in range(len(board)))
-        else:
-            return win
+    def ai_move(self):
+        """Start the AI's search on a worker thread; its move comes back as an AI_MOVE_EVENT."""
+        if self.turn_state == TURN_THINKING or not self.empty_indices():
+            return
+        self.ai_search_token += 1
+        self.ai_search_engine = self.snapshot()
+        self.turn_state = TURN_THINKING
+        self.ai_thinking_since = pygame.time.get_ticks()
+        worker = threading.Thread(target=self.run_ai_search,
+                                  args=(self.ai_search_engine, self.ai_search_token), daemon=True)
+        worker.start()
+
+    def run_ai_search(self, engine, token):
+        """Worker thread body: search on a snapshot of the game and post the chosen move back."""
+        # The event is always posted, so a failed search cannot leave the scheduler waiting for good
+        error = None
+        try:
+            index = None if engine.stop_requested else engine.choose_move()
+        except Exception as e:
+            print("Error during AI search:", repr(e))
+            index = None
+            error = str(e) or type(e).__name__
+        pygame.event.post(pygame.event.Event(AI_MOVE_EVENT, index=index, token=token, error=error))
+
+    def start_pondering(self):
+        """While the player thinks, search the replies they are likely to make on a worker thread."""
+        # Only the search-based AI can use what pondering finds
+        if not self.pondering_enabled or self.difficulty != 'Hard' or self.ai_personality != 'Balanced':
+            return
+        self.stop_pondering()
+        self.ponder_engine = self.snapshot()
+        threading.Thread(target=self.ponder_engine.ponder, daemon=True).start()
+
+    def stop_pondering(self):
+        if self.ponder_engine is not None:
+            self.ponder_engine.request_stop()
+            self.ponder_engine = None
+
+    def cancel_ai_search(self):
+        """Abort a running AI search, any pondering, hint analysis and scheduled AI turn; a cancelled result is ignored when it arrives."""
+        self.stop_pondering()
+        self.cancel_hint()
+        if self.turn_state == TURN_THINKING:
+            self.ai_search_engine.request_stop()
+            self.ai_search_token += 1
+        self.turn_state = TURN_IDLE
+        self.pending_ai_move = None
+
+    def handle_ai_move_event(self, event):
+        if event.token != self.ai_search_token:
+            return
+        if event.error is not None or event.index is None:
+            self.turn_state = TURN_IDLE
+            self.pending_ai_move = None
+            if event.error is not None:
+                self.show_message(f"{self.ai_name} failed to move")
+            return
+        # Keep the worker's MCTS tree so the next search can reuse it
+        self.mcts = self.ai_search_engine.mcts
+        # The move is played by update_turns() once the pace allows
+        self.pending_ai_move = event.index
+        self.turn_state = TURN_READY
 
     def draw_winning_line(self, combo):
         start_index = combo[0]
@@ -806,13 +870,9 @@ class TicTacToe:
             self.ai_score += 1
             self.ai_wins += 1
             message = f"{self.ai_name} wins!"
-            if self.ai_personality == 'Learning':
-                board_key = tuple(self.board)
-                if board_key not in self.learning_table:
-                    self.learning_table[board_key] = {}
-                move = self.last_move
-                self.learning_table[board_key][move] = self.learning_table[board_key].get(move, 0) + 1
             self.update_current_profile("loss")
+        if self.ai_personality == 'Learning':
+            self.record_learning_game(self.game_moves(), winner)
         self.play_sound(self.win_sound)
         self.fade_game_over(message)
         self.state = GAME_OVER
@@ -821,6 +881,8 @@ class TicTacToe:
         self.ties += 1
         self.total_games += 1
         self.update_current_profile("tie")
+        if self.ai_personality == 'Learning':
+            self.record_learning_game(self.game_moves(), '')
         self.play_sound(self.tie_sound)
         self.fade_game_over("It's a tie!")
         self.state = GAME_OVER
@@ -846,15 +908,12 @@ class TicTacToe:
         pygame.time.delay(1500)
 
     def reset_board(self):
-        self.board = [''] * (self.board_size * self.board_size)
-        self.current_player = 'X'
-        self.last_move = None
-        self.move_history.clear()
-        self.redo_history.clear()
-        self.memoization.clear()
+        self.cancel_ai_search()
+        self.reset()
         self.hint_index = None
+        # Only scheduled: the first move waits until the game screen is showing
         if self.game_mode == 'AI vs AI':
-            self.ai_move()
+            self.schedule_ai_turn()
 
     def draw(self):
         if self.state == MENU:
@@ -915,10 +974,22 @@ class TicTacToe:
             elif self.board[i] == 'O':
                 self.draw_o(x, y)
         if self.hint_index is not None:
+            self.draw_hint_heatmap()
             x = (self.hint_index % self.board_size) * self.cell_size
             y = (self.hint_index // self.board_size) * self.cell_size
             hint_rect = pygame.Rect(x, y, self.cell_size, self.cell_size)
             pygame.draw.rect(WINDOW, self.themes[self.theme]['hint'], hint_rect, 4)
+            for number, index in enumerate(self.hint_line[1:], 2):
+                if self.board[index] != '':
+                    break
+                number_text = SCORE_FONT.render(str(number), True, self.themes[self.theme]['hint'])
+                x = (index % self.board_size) * self.cell_size + 6
+                y = (index // self.board_size) * self.cell_size + 4
+                WINDOW.blit(number_text, (x, y))
+        if self.turn_state == TURN_THINKING:
+            dots = '.' * ((pygame.time.get_ticks() - self.ai_thinking_since) // 300 % 4)
+            thinking_text = SCORE_FONT.render(f"{self.ai_name} is thinking{dots}", True, self.themes[self.theme]['text'])
+            WINDOW.blit(thinking_text, (WINDOW_SIZE // 2 - thinking_text.get_width() // 2, WINDOW_SIZE - 30))
         self.draw_scores()
         self.draw_stats()
         pygame.draw.rect(WINDOW, self.themes[self.theme]['button'], self.back_button_rect)
@@ -1039,6 +1110,18 @@ class TicTacToe:
         learning_button_rect = learning_button.get_rect(topleft=(200, y_offset))
         self.settings_clickable_areas.append(('set_ai_personality', 'Learning', learning_button_rect))
         WINDOW.blit(learning_button, learning_button_rect)
+        y_offset += 40
+
+        # MCTS needs NumPy; without it the option is shown greyed out and cannot be picked
+        mcts_enabled = mcts_available()
+        if mcts_enabled:
+            mcts_button = SCORE_FONT.render("MCTS (best on 5 x 5)", True, self.themes[self.theme]['text'])
+        else:
+            mcts_button = SCORE_FONT.render("MCTS (requires NumPy)", True, self.themes[self.theme]['button'])
+        mcts_button_rect = mcts_button.get_rect(topleft=(200, y_offset))
+        if mcts_enabled:
+            self.settings_clickable_areas.append(('set_ai_personality', 'MCTS', mcts_button_rect))
+        WINDOW.blit(mcts_button, mcts_button_rect)
         y_offset += 60
 
         board_size_label = FONT.render("Select Board Size:", True, self.themes[self.theme]['text'])
@@ -1047,20 +1130,32 @@ class TicTacToe:
 
         size_3_button = SCORE_FONT.render("3 x 3", True, self.themes[self.theme]['text'])
         size_3_button_rect = size_3_button.get_rect(topleft=(200, y_offset))
-        self.settings_clickable_areas.append(('set_board_size', 3, size_3_button_rect))
+        self.settings_clickable_areas.append(('set_board_size', (3, 3), size_3_button_rect))
         WINDOW.blit(size_3_button, size_3_button_rect)
         y_offset += 40
 
         size_4_button = SCORE_FONT.render("4 x 4", True, self.themes[self.theme]['text'])
         size_4_button_rect = size_4_button.get_rect(topleft=(200, y_offset))
-        self.settings_clickable_areas.append(('set_board_size', 4, size_4_button_rect))
+        self.settings_clickable_areas.append(('set_board_size', (4, 4), size_4_button_rect))
         WINDOW.blit(size_4_button, size_4_button_rect)
         y_offset += 40
 
         size_5_button = SCORE_FONT.render("5 x 5", True, self.themes[self.theme]['text'])
         size_5_button_rect = size_5_button.get_rect(topleft=(200, y_offset))
-        self.settings_clickable_areas.append(('set_board_size', 5, size_5_button_rect))
+        self.settings_clickable_areas.append(('set_board_size', (5, 5), size_5_button_rect))
         WINDOW.blit(size_5_button, size_5_button_rect)
+        y_offset += 40
+
+        size_4_3_button = SCORE_FONT.render("4 x 4, 3 in a row", True, self.themes[self.theme]['text'])
+        size_4_3_button_rect = size_4_3_button.get_rect(topleft=(200, y_offset))
+        self.settings_clickable_areas.append(('set_board_size', (4, 3), size_4_3_button_rect))
+        WINDOW.blit(size_4_3_button, size_4_3_button_rect)
+        y_offset += 40
+
+        size_5_4_button = SCORE_FONT.render("5 x 5, 4 in a row", True, self.themes[self.theme]['text'])
+        size_5_4_button_rect = size_5_4_button.get_rect(topleft=(200, y_offset))
+        self.settings_clickable_areas.append(('set_board_size', (5, 4), size_5_4_button_rect))
+        WINDOW.blit(size_5_4_button, size_5_4_button_rect)
         y_offset += 60
 
         misere_button = SCORE_FONT.render(f"Toggle Misère Mode (Current: {'On' if self.misere_mode else 'Off'})", True, self.themes[self.theme]['text'])
@@ -1069,6 +1164,24 @@ class TicTacToe:
         WINDOW.blit(misere_button, misere_button_rect)
         y_offset += 40
 
+        ponder_button = SCORE_FONT.render(f"Toggle Pondering (Current: {'On' if self.pondering_enabled else 'Off'})", True, self.themes[self.theme]['text'])
+        ponder_button_rect = ponder_button.get_rect(topleft=(200, y_offset))
+        self.settings_clickable_areas.append(('toggle_pondering', None, ponder_button_rect))
+        WINDOW.blit(ponder_button, ponder_button_rect)
+        y_offset += 40
+
+        cache_button = SCORE_FONT.render(f"Toggle Search Cache (Current: {'On' if self.search_cache is not None else 'Off'})", True, self.themes[self.theme]['text'])
+        cache_button_rect = cache_button.get_rect(topleft=(200, y_offset))
+        self.settings_clickable_areas.append(('toggle_search_cache', None, cache_button_rect))
+        WINDOW.blit(cache_button, cache_button_rect)
+        y_offset += 40
+
+        pace_button = SCORE_FONT.render(f"AI vs AI Pace (Current: {self.ai_vs_ai_pace})", True, self.themes[self.theme]['text'])
+        pace_button_rect = pace_button.get_rect(topleft=(200, y_offset))
+        self.settings_clickable_areas.append(('cycle_ai_pace', None, pace_button_rect))
+        WINDOW.blit(pace_button, pace_button_rect)
+        y_offset += 40
+
         self.content_height = y_offset - self.settings_scroll_offset
         pygame.draw.rect(WINDOW, self.themes[self.theme]['button'], self.back_button_rect)
         back_text = SCORE_FONT.render("Back", True, self.themes[self.theme]['button_text'])
@@ -1082,11 +1195,13 @@ class TicTacToe:
             "Gameplay Features:",
             "- Undo: Press U to undo the last move",
             "- Redo: Press Y to redo an undone move",
-            "- Hint: Press I to show a recommended move",
+            "- Replay: Home jumps to the first move, End to the last",
+            "- Hint: Press I to show a recommended move, the expected line and a heatmap of every move",
             "- Pause: Press P to pause the game",
             "",
             "AI & Difficulty:",
             "- Press E, M, or H to set AI difficulty",
+            "- Press Esc or U while the AI is thinking to cancel its move",
             "- Adjust AI personality and board size in Settings",
             "",
             "Sound:",
@@ -1109,6 +1224,24 @@ class TicTacToe:
             WINDOW.blit(line_surface, (40, y_offset))
             y_offset += 25
 
+    def draw_hint_heatmap(self):
+        scores = [entry['score'] for entry in self.hint_analysis
+                  if entry['result'] is None and entry['score'] is not None]
+        low, high = (min(scores), max(scores)) if scores else (0, 0)
+        loss, win = HEATMAP_COLORS['loss'], HEATMAP_COLORS['win']
+        for entry in self.hint_analysis:
+            if self.board[entry['move']] != '' or entry['score'] is None:
+                continue
+            if entry['result'] is not None:
+                color = HEATMAP_COLORS[entry['result']]
+            else:
+                t = (entry['score'] - low) / (high - low) if high > low else 0.5
+                color = tuple(int(l + (w - l) * t) for l, w in zip(loss, win))
+            cell = pygame.Surface((self.cell_size, self.cell_size), pygame.SRCALPHA)
+            cell.fill((*color, HEATMAP_ALPHA))
+            WINDOW.blit(cell, ((entry['move'] % self.board_size) * self.cell_size,
+                               (entry['move'] // self.board_size) * self.cell_size))
+
     def draw_game_over(self):
         WINDOW.fill(self.themes[self.theme]['background'])
         message = FONT.render("Game Over!", True, self.themes[self.theme]['text'])
@@ -1168,12 +1301,11 @@ class TicTacToe:
         self.ai_personality = personality
         print(f"AI Personality set to {self.ai_personality}")
 
-    def set_board_size(self, size):
-        self.board_size = size
-        self.win_length = size
+    def set_board_size(self, size, win_length=None):
+        TicTacToeEngine.set_board_size(self, size, win_length)
         self.reset_board()
         self.update_grid_lines()
-        print(f"Board size set to {size}x{size}")
+        print(f"Board size set to {size}x{size}, {self.win_length} in a row")
 
     def toggle_theme(self):
         self.theme = 'Dark' if self.theme == 'Light' else 'Light'
@@ -1183,12 +1315,6 @@ class TicTacToe:
     def update_theme(self):
         self.input_box.update_theme(self.themes[self.theme])
 
-    def get_hint_move(self):
-        empty_indices = [i for i, x in enumerate(self.board) if x == '']
-        if not empty_indices:
-            return None
-        return self.minimax_ai()
-
     # ===== Original save_scores and load_scores have been replaced by the profiles methods =====
 
     def load_theme(self):
@@ -1211,4 +1337,5 @@ class TicTacToe:
             print("Error saving theme:", e)
 
 if __name__ == "__main__":
-    game = TicTacToe()
\ No newline at end of file
+    game = TicTacToe()
+    game.main_loop()
\ No newline at end of file
@@ -0,0 +1,75 @@
+import numpy as np
+from tic_tac_toe_engine import SEGMENTS
+
+"""
+Vectorized win detection over many Tic-Tac-Toe boards at once.
+
+Boards are rows of an (N, board_size * board_size) int8 array holding 1 for X,
+-1 for O and 0 for an empty cell. Line membership is a precomputed
+(cells, lines) 0/1 matrix, so counting every player's stones on every line of
+every board is a single matrix product followed by NumPy reductions.
+
+Author: Jeremiah Ddumba
+"""
+
+X_VALUE = 1
+O_VALUE = -1
+
+
+def build_line_matrix(n, k):
+    """(cells, lines) matrix with a 1 where the cell lies on the k-in-a-row win line."""
+    masks = SEGMENTS[(n, k)]
+    matrix = np.zeros((n * n, len(masks)), dtype=np.float32)
+    for line, mask in enumerate(masks):
+        for i in range(n * n):
+            if mask >> i & 1:
+                matrix[i, line] = 1
+    return matrix
+
+LINE_MATRICES = {key: build_line_matrix(*key) for key in SEGMENTS}
+
+
+def has_line(boards, board_size, value, win_length=None):
+    """Boolean array: does the player stored as value own a complete win line on each board?"""
+    win_length = win_length or board_size
+    counts = (boards == value).astype(np.float32) @ LINE_MATRICES[(board_size, win_length)]
+    return (counts == win_length).any(axis=1)
+
+
+def batch_results(boards, board_size, misere_mode=False, win_length=None):
+    """
+    Classify N boards at once. Returns (winner, draw, terminal):
+      winner   int8 array, 1 for X, -1 for O, 0 for no winner
+      draw     bool array, full board with no winner
+      terminal bool array, winner or draw
+
+    Matches TicTacToeEngine.check_winner as make_move uses it: only the player who moved
+    last (X when X has more stones, otherwise O) can have just won. In misère mode that
+    player wins when the board is non-empty and they do *not* own a complete line.
+    """
+    boards = np.asarray(boards, dtype=np.int8)
+    x_count = (boards == X_VALUE).sum(axis=1)
+    o_count = (boards == O_VALUE).sum(axis=1)
+    last_mover = np.where(x_count > o_count, X_VALUE, O_VALUE).astype(np.int8)
+    x_line = has_line(boards, board_size, X_VALUE, win_length)
+    o_line = has_line(boards, board_size, O_VALUE, win_length)
+    mover_line = np.where(last_mover == X_VALUE, x_line, o_line)
+    if misere_mode:
+        mover_wins = ~mover_line & (x_count + o_count > 0)
+    else:
+        mover_wins = mover_line
+    winner = np.where(mover_wins, last_mover, 0).astype(np.int8)
+    if not misere_mode:
+        # A line for the other player cannot arise in play, but report it rather than hide it
+        other_line = np.where(last_mover == X_VALUE, o_line, x_line)
+        winner = np.where(~mover_wins & other_line, -last_mover, winner).astype(np.int8)
+    full = x_count + o_count == board_size * board_size
+    draw = (winner == 0) & full
+    terminal = (winner != 0) | draw
+    return winner, draw, terminal
+
+
+def boards_from_engine_boards(engine_boards):
+    """Convert a list of engine boards ('' / 'X' / 'O' cells) into the int8 batch layout."""
+    values = {'': 0, 'X': X_VALUE, 'O': O_VALUE}
+    return np.array([[values[cell] for cell in board] for board in engine_boards], dtype=np.int8)
@@ -0,0 +1,348 @@
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from tic_tac_toe_engine import TicTacToeEngine, MoveOrdering, DIFFICULTY_LEVELS, WIN_SCORE
+from tic_tac_toe_parallel import parallel_search, get_executor, shutdown_executors
+from tic_tac_toe_book import lookup_book_move
+from tic_tac_toe_tablebase import tablebase_move
+
+"""
+Benchmarks for the headless Tic-Tac-Toe engine.
+
+Positions are written row by row with 'X', 'O' and '.' for empty cells; the side
+to move follows from the stone counts (X moves first).
+
+Usage:
+    python tic_tac_toe_bench.py suite --json results.json
+    python tic_tac_toe_bench.py ordering
+    python tic_tac_toe_bench.py algorithms
+    python tic_tac_toe_bench.py parallel
+    python tic_tac_toe_bench.py batch
+
+Author: Jeremiah Ddumba
+"""
+
+BENCHMARK_POSITIONS = {
+    3: [
+        ".........",
+        "....X....",
+        "X...O....",
+        "X.O.X....",
+        "XO..X...O",
+    ],
+    4: [
+        "................",
+        ".....X..........",
+        "X....O....X.....",
+        "XO...XO.........",
+        "X..O.XO...X..O..",
+    ],
+    5: [
+        ".........................",
+        "............X............",
+        "......X.....O............",
+        "......XO....X.....O......",
+        "X.....O.....X.....O...X..",
+    ],
+}
+
+# Late positions with few empty cells, none of them already decided
+ENDGAME_POSITIONS = {
+    3: [".XXOOX.O.", ".XO.OX.OX", "XOX.O.O.X"],
+    4: [".OXXO.OXXO.XX.O.", ".OOOX..OXOXX.X.X", ".XO.O.XOXO.XXO.X"],
+    5: [
+        "O.OXOXOXX.X.OOXOOOX..X..X",
+        "OXXOX..OXO.XXXXO.O.X..OOO",
+        "O..XX..XX.XXOXOOO.OOXOX.O",
+    ],
+}
+
+# Curated position sets for the benchmark suite, by board size and game phase
+POSITION_SETS = {
+    n: {
+        'opening': BENCHMARK_POSITIONS[n][:2],
+        'midgame': BENCHMARK_POSITIONS[n][2:],
+        'endgame': ENDGAME_POSITIONS[n],
+    }
+    for n in (3, 4, 5)
+}
+
+# Engine entry points measured by the suite: (engine keyword arguments, move function)
+ENGINE_CONFIGS = {
+    'minimax': ({}, lambda e: e.minimax_ai()),
+    'minimax_two_tier_tt': ({'tt_policy': 'two_tier'}, lambda e: e.minimax_ai()),
+    'easy_level': ({}, lambda e: e.budgeted_move(*DIFFICULTY_LEVELS['Easy'])),
+    'medium_level': ({}, lambda e: e.budgeted_move(*DIFFICULTY_LEVELS['Medium'])),
+    'block_player': ({}, lambda e: e.block_player(e.empty_indices())),
+    'learning_move': ({}, lambda e: e.learning_move(e.empty_indices())),
+    'get_hint_move': ({}, lambda e: e.get_hint_move()),
+    'analyze_moves': ({}, lambda e: e.analyze_moves()),
+    # Precomputed tables on their own; they time a miss when the file has not been built locally
+    'tablebase_lookup': ({}, lambda e: tablebase_move(e)),
+    'book_lookup': ({}, lambda e: lookup_book_move(e.board_size, e.misere_mode, e.hashes)),
+}
+
+# Fixed search depth per board size so node counts are comparable between runs
+BENCHMARK_DEPTHS = {3: 9, 4: 8, 5: 6}
+
+ORDERING_CONFIGS = {
+    'index order': lambda n: MoveOrdering(n, static=False, killers=False, history=False),
+    'static': lambda n: MoveOrdering(n, static=True, killers=False, history=False),
+    'static+killers': lambda n: MoveOrdering(n, static=True, killers=True, history=False),
+    'static+killers+history': lambda n: MoveOrdering(n),
+}
+
+
+def load_position(engine, position):
+    """Set the engine's board from a position string and pick the side to move."""
+    engine.board = ['' if c == '.' else c for c in position.ljust(engine.board_size ** 2, '.')]
+    engine.sync_masks()
+    engine.current_player = 'X' if engine.board.count('X') == engine.board.count('O') else 'O'
+
+
+def require_depth(engine, depth):
+    """Stop the benchmark if a search ended short of depth without a decided result."""
+    full_depth = min(depth, len(engine.empty_indices()))
+    assert engine.search_depth == full_depth or abs(engine.search_score) >= WIN_SCORE, \
+        f"search stopped at depth {engine.search_depth} of {full_depth}"
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_config(config, board_size, misere_mode, repeat):
+    """Time every suite position for one engine configuration; returns (move times, nodes, probes, hits)."""
+    engine_kwargs, move_function = ENGINE_CONFIGS[config]
+    times = []
+    nodes = probes = hits = 0
+    for phase_positions in POSITION_SETS[board_size].values():
+        for position in phase_positions:
+            for _ in range(repeat):
+                # A fresh engine per move so no result leaks between measurements
+                engine = TicTacToeEngine(board_size, misere_mode, **engine_kwargs)
+                engine.ai_depth = BENCHMARK_DEPTHS[board_size]
+                engine.time_budget = None
+                # Tablebase and book files may or may not exist locally; searches must not depend on them
+                engine.use_tablebase = engine.use_opening_book = False
+                load_position(engine, position)
+                start = time.perf_counter()
+                move_function(engine)
+                times.append(time.perf_counter() - start)
+                nodes += engine.search_nodes
+                probes += engine.memoization.probes
+                hits += engine.memoization.hits
+    return times, nodes, probes, hits
+
+
+def run_suite(configs=None, sizes=(3, 4, 5), repeat=3):
+    """
+    Measure each engine configuration on every position set.
+    Returns a JSON-ready dict of nodes/sec, move time percentiles, TT hit rate and peak memory.
+
+    Only normal rules are measured: under misère rules any stone that completes no line
+    ends the game, so every suite position past the empty board is already decided.
+    """
+    configs = configs or list(ENGINE_CONFIGS)
+    results = []
+    for config in configs:
+        for n in sizes:
+            times, nodes, probes, hits = run_config(config, n, False, repeat)
+            # Memory is traced in a separate pass because tracemalloc slows execution down
+            tracemalloc.start()
+            run_config(config, n, False, 1)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            total = sum(times)
+            results.append({
+                'config': config,
+                'board_size': n,
+                'misere': False,
+                'moves': len(times),
+                'nodes': nodes,
+                'nodes_per_sec': nodes / total if total else 0.0,
+                'p50_ms': 1000 * percentile(times, 0.5),
+                'p90_ms': 1000 * percentile(times, 0.9),
+                'p99_ms': 1000 * percentile(times, 0.99),
+                'max_ms': 1000 * max(times),
+                'tt_hit_rate': hits / probes if probes else 0.0,
+                'peak_memory_kb': peak / 1024,
+            })
+            r = results[-1]
+            print(f"{config:<20} {n}x{n}"
+                  f" {r['nodes_per_sec']:>10.0f} nodes/s  p50 {r['p50_ms']:8.2f}ms  p90 {r['p90_ms']:8.2f}ms"
+                  f"  p99 {r['p99_ms']:8.2f}ms  TT hits {100 * r['tt_hit_rate']:5.1f}%"
+                  f"  peak {r['peak_memory_kb']:8.0f}KB")
+    return {'meta': run_metadata(), 'results': results}
+
+
+def run_metadata():
+    """Identify the run so JSON results from different commits can be compared."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit,
+        'date': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'depths': BENCHMARK_DEPTHS,
+    }
+
+
+def compare_move_ordering(sizes=(3, 4, 5)):
+    """Search every benchmark position under each ordering and report average nodes per move."""
+    results = {}
+    for n in sizes:
+        depth = BENCHMARK_DEPTHS[n]
+        print(f"{n}x{n} board, depth {depth}:")
+        baseline = None
+        for name, factory in ORDERING_CONFIGS.items():
+            engine = TicTacToeEngine(board_size=n, ordering_factory=factory)
+            # Node counts are only comparable at full depth, so no time limit at all
+            engine.time_budget = None
+            nodes = 0
+            start = time.perf_counter()
+            # Positions run in sequence like the moves of one game, so history carries over
+            for position in BENCHMARK_POSITIONS[n]:
+                load_position(engine, position)
+                engine.iterative_deepening(max_depth=depth, time_budget=None)
+                require_depth(engine, depth)
+                nodes += engine.search_nodes
+            elapsed = time.perf_counter() - start
+            per_move = nodes / len(BENCHMARK_POSITIONS[n])
+            if baseline is None:
+                baseline = per_move
+            results[(n, name)] = per_move
+            print(f"  {name:<24} {per_move:>10.0f} nodes/move  {baseline / per_move:5.2f}x fewer  {elapsed:6.2f}s")
+    return results
+
+
+def compare_search_algorithms(sizes=(3, 4, 5)):
+    """
+    Plain alpha-beta minimax against PVS on the benchmark positions. A single fixed-depth
+    search checks that both pick the same move and score; iterative deepening (with
+    aspiration windows for PVS) is how moves are actually chosen in play.
+    """
+    results = {}
+    for n in sizes:
+        depth = BENCHMARK_DEPTHS[n]
+        print(f"{n}x{n} board, depth {depth}:")
+        outcomes = {}
+        for algorithm in ('minimax', 'pvs'):
+            fixed_nodes = deepening_nodes = 0
+            outcomes[algorithm] = []
+            start = time.perf_counter()
+            for position in BENCHMARK_POSITIONS[n]:
+                engine = TicTacToeEngine(board_size=n)
+                engine.search_algorithm = algorithm
+                load_position(engine, position)
+                engine.begin_search(None)
+                outcomes[algorithm].append(engine.search_root(depth))
+                engine.end_search()
+                fixed_nodes += engine.search_nodes
+                engine = TicTacToeEngine(board_size=n)
+                engine.search_algorithm = algorithm
+                # Compare the algorithms at the same depth: no time limit at all
+                engine.time_budget = None
+                load_position(engine, position)
+                engine.iterative_deepening(max_depth=depth, time_budget=None)
+                require_depth(engine, depth)
+                deepening_nodes += engine.search_nodes
+            elapsed = time.perf_counter() - start
+            results[(n, algorithm)] = (fixed_nodes, deepening_nodes)
+            print(f"  {algorithm:<8} {fixed_nodes:>10} nodes fixed depth  {deepening_nodes:>10} nodes deepening"
+                  f"  {elapsed:6.2f}s")
+        same = sum(a == b for a, b in zip(outcomes['minimax'], outcomes['pvs']))
+        ratios = [m / p for m, p in zip(results[(n, 'minimax')], results[(n, 'pvs')])]
+        print(f"  same move and score on {same}/{len(BENCHMARK_POSITIONS[n])} positions,"
+              f" {ratios[0]:5.2f}x / {ratios[1]:5.2f}x fewer nodes")
+    return results
+
+
+def measure_parallel_speedup(sizes=(4, 5), worker_counts=(1, 2, 4, 8)):
+    """Time fixed-depth root-parallel searches of the benchmark positions at each worker count."""
+    results = {}
+    for n in sizes:
+        depth = BENCHMARK_DEPTHS[n]
+        print(f"{n}x{n} board, depth {depth}:")
+        baseline = None
+        for workers in worker_counts:
+            get_executor(workers)  # start the pool outside the timed region
+            engine = TicTacToeEngine(board_size=n)
+            # time_budget=None falls back to the engine's budget, so lift that too: every worker count searches to depth
+            engine.time_budget = None
+            nodes = 0
+            start = time.perf_counter()
+            for position in BENCHMARK_POSITIONS[n]:
+                load_position(engine, position)
+                parallel_search(engine, workers, max_depth=depth, time_budget=None)
+                require_depth(engine, depth)
+                nodes += engine.search_nodes
+            elapsed = time.perf_counter() - start
+            if baseline is None:
+                baseline = elapsed
+            results[(n, workers)] = elapsed
+            print(f"  {workers} workers  {elapsed:6.2f}s  {nodes:>9} nodes  {baseline / elapsed:5.2f}x speedup")
+    shutdown_executors()
+    return results
+
+
+def measure_batch_throughput(sizes=(3, 4, 5), count=1000000):
+    """Boards per second classified by tic_tac_toe_batch.batch_results on random positions."""
+    # NumPy is only needed for this benchmark
+    import numpy as np
+    from tic_tac_toe_batch import batch_results
+    rng = np.random.default_rng(0)
+    results = {}
+    for n in sizes:
+        boards = rng.integers(-1, 2, size=(count, n * n), dtype=np.int8)
+        for misere_mode in (False, True):
+            start = time.perf_counter()
+            batch_results(boards, n, misere_mode)
+            elapsed = time.perf_counter() - start
+            rate = count / elapsed
+            results[(n, misere_mode)] = rate
+            mode = 'misère' if misere_mode else 'normal'
+            print(f"{n}x{n} {mode:<7} {rate / 1e6:6.2f}M boards/s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tic-Tac-Toe engine benchmarks")
+    subparsers = parser.add_subparsers(dest='command')
+    suite = subparsers.add_parser('suite', help="position-set benchmark of every engine configuration")
+    suite.add_argument('--configs', nargs='+', choices=list(ENGINE_CONFIGS))
+    suite.add_argument('--sizes', nargs='+', type=int, default=[3, 4, 5], choices=[3, 4, 5])
+    suite.add_argument('--repeat', type=int, default=3)
+    suite.add_argument('--json', help="write machine-readable results to this file")
+    subparsers.add_parser('ordering', help="nodes per move under each move-ordering heuristic")
+    subparsers.add_parser('algorithms', help="nodes searched by minimax and PVS at the benchmark depths")
+    subparsers.add_parser('parallel', help="root-parallel speedup at 1/2/4/8 workers")
+    subparsers.add_parser('batch', help="batch win-detection throughput")
+    args = parser.parse_args()
+
+    if args.command == 'ordering':
+        compare_move_ordering()
+    elif args.command == 'algorithms':
+        compare_search_algorithms()
+    elif args.command == 'parallel':
+        measure_parallel_speedup()
+    elif args.command == 'batch':
+        measure_batch_throughput()
+    else:
+        if args.command is None:
+            args = parser.parse_args(['suite'])
+        report = run_suite(args.configs, args.sizes, args.repeat)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from tic_tac_toe_engine import TicTacToeEngine, SYMMETRIES, board_hashes, canonical_hash, canonical_symmetry
+
+"""
+Precomputed opening book for the Tic-Tac-Toe engine.
+
+The builder searches the first few plies of a board size far deeper than a move in
+play can afford and writes the best move of every canonical position to a sorted
+binary file. At runtime the file is memory-mapped and binary-searched in place, so a
+book move costs a few microseconds and nothing is loaded into the Python heap.
+
+Only positions that can actually arise are stored: on the book side's turn the
+builder follows the book move, on the opponent's turn it expands every reply. Both
+X and O are covered.
+
+Usage:
+    python tic_tac_toe_book.py --size 5 --plies 4 --time-budget 5
+
+Author: Jeremiah Ddumba
+"""
+
+BOOK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Record layout shared by every sorted-key file: little-endian 64-bit key, then the value
+KEY_FORMAT = '<Q'
+KEY = struct.Struct(KEY_FORMAT)
+# Book values are the best move as a cell index in the canonical orientation
+BOOK_VALUE_FORMAT = 'B'
+
+
+class SortedKeyFile:
+    """
+    Read-only table of fixed-size (key, value) records sorted by key. The file is
+    memory-mapped and searched in place, so opening it costs nothing up front.
+    """
+    def __init__(self, path, value_format):
+        self.record = struct.Struct(KEY_FORMAT + value_format)
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        # mmap cannot map an empty file
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.count = size // self.record.size
+
+    def __len__(self):
+        return self.count
+
+    def get(self, key, default=None):
+        """Value tuple stored under key, or default."""
+        record_size = self.record.size
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key = KEY.unpack_from(self.map, mid * record_size)[0]
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                return self.record.unpack_from(self.map, mid * record_size)[1:]
+        return default
+
+    def items(self):
+        """Every (key, value tuple) record in key order."""
+        for record in self.record.iter_unpack(self.map):
+            yield record[0], record[1:]
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+
+def write_sorted_key_file(path, records, value_format):
+    """Write {key: value tuple} as a SortedKeyFile, replacing any existing file atomically."""
+    record = struct.Struct(KEY_FORMAT + value_format)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        for key in sorted(records):
+            f.write(record.pack(key, *records[key]))
+    os.replace(temp_path, path)
+
+
+def book_path(board_size, misere_mode=False):
+    suffix = '_misere' if misere_mode else ''
+    return os.path.join(BOOK_DIR, f'opening_book_{board_size}x{board_size}{suffix}.bin')
+
+
+# Opened books, and None for books that have not been built, by (board_size, misere_mode)
+_books = {}
+
+
+def opening_book(board_size, misere_mode=False):
+    """The memory-mapped book for this configuration, or None if none has been built."""
+    key = (board_size, misere_mode)
+    if key not in _books:
+        path = book_path(board_size, misere_mode)
+        _books[key] = SortedKeyFile(path, BOOK_VALUE_FORMAT) if os.path.exists(path) else None
+    return _books[key]
+
+
+def lookup_book_move(board_size, misere_mode, hashes):
+    """Canonical book move for the position with these symmetry hashes, or None."""
+    book = opening_book(board_size, misere_mode)
+    if book is None:
+        return None
+    value = book.get(canonical_hash(hashes))
+    return value[0] if value is not None else None
+
+
+# --- Builder ---
+# Per-process engine for the builder, so its transposition table carries over between positions
+_builder_engine = None
+
+
+def solve_position(task):
+    """Worker task: deep search of one position. Returns the best move on the given board."""
+    global _builder_engine
+    board_size, misere_mode, x_mask, o_mask, player, max_depth, time_budget = task
+    if _builder_engine is None or _builder_engine.board_size != board_size \
+            or _builder_engine.misere_mode != misere_mode:
+        _builder_engine = TicTacToeEngine(board_size, misere_mode)
+        _builder_engine.use_opening_book = False
+    engine = _builder_engine
+    engine.board = ['X' if x_mask >> i & 1 else 'O' if o_mask >> i & 1 else '' for i in range(board_size ** 2)]
+    engine.sync_masks()
+    engine.current_player = player
+    return engine.iterative_deepening(max_depth=max_depth, time_budget=time_budget)
+
+
+def build_book(board_size=5, misere_mode=False, plies=4, max_depth=25, time_budget=5.0, workers=None):
+    """
+    Search every position reachable in the first plies moves with the book side to move.
+    Returns {canonical key: (canonical move,)}, ready for write_sorted_key_file.
+    """
+    rules = TicTacToeEngine(board_size, misere_mode)
+    book = {}
+    with ProcessPoolExecutor(workers) as executor:
+        for book_side in ('X', 'O'):
+            frontier = {canonical_hash(board_hashes(0, 0, board_size)): (0, 0)}
+            for ply in range(plies):
+                player = 'X' if ply % 2 == 0 else 'O'
+                if player == book_side:
+                    positions = [key for key in frontier if key not in book]
+                    tasks = [(board_size, misere_mode, *frontier[key], player, max_depth, time_budget)
+                             for key in positions]
+                    for key, move in zip(positions, executor.map(solve_position, tasks)):
+                        x_mask, o_mask = frontier[key]
+                        symmetry = canonical_symmetry(board_hashes(x_mask, o_mask, board_size))
+                        book[key] = (SYMMETRIES[board_size][symmetry][move],)
+                    print(f"{board_size}x{board_size} {book_side} ply {ply}: {len(positions)} positions searched")
+                frontier = expand(rules, frontier, player, book if player == book_side else None)
+    return book
+
+
+def expand(rules, frontier, player, book=None):
+    """
+    Positions one ply later, deduplicated by canonical key. With a book only the book
+    move is followed, otherwise every empty cell is. Finished games are dropped.
+    """
+    n = rules.board_size
+    following = {}
+    for key, (x_mask, o_mask) in frontier.items():
+        occupied = x_mask | o_mask
+        if book is not None:
+            symmetry = canonical_symmetry(board_hashes(x_mask, o_mask, n))
+            moves = [SYMMETRIES[n][symmetry].index(book[key][0])]
+        else:
+            moves = [i for i in range(n * n) if not occupied >> i & 1]
+        for i in moves:
+            bit = 1 << i
+            child_x = x_mask | bit if player == 'X' else x_mask
+            child_o = o_mask | bit if player == 'O' else o_mask
+            if rules.mask_wins(child_x if player == 'X' else child_o, occupied | bit) \
+                    or occupied | bit == rules.full_mask:
+                continue
+            following.setdefault(canonical_hash(board_hashes(child_x, child_o, n)), (child_x, child_o))
+    return following
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a Tic-Tac-Toe opening book")
+    parser.add_argument('--size', type=int, default=5, choices=[3, 4, 5])
+    parser.add_argument('--misere', action='store_true')
+    parser.add_argument('--plies', type=int, default=4, help="opening moves covered by the book")
+    parser.add_argument('--depth', type=int, default=25, help="maximum search depth per position")
+    parser.add_argument('--time-budget', type=float, default=5.0, help="seconds of search per position")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    book = build_book(args.size, args.misere, args.plies, args.depth, args.time_budget, args.workers)
+    path = book_path(args.size, args.misere)
+    write_sorted_key_file(path, book, BOOK_VALUE_FORMAT)
+    print(f"Wrote {len(book)} positions to {path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import sqlite3
+import threading
+
+"""
+Persistent search cache for the Tic-Tac-Toe engine.
+
+The in-memory transposition table is cleared between games, so without this every
+game and every launch searches the same openings again. The cache keeps the result
+of each completed root search in an SQLite file: the depth reached, the score and
+the best move, keyed by board rules and canonical position hash (moves are stored
+in the canonical orientation, so all 8 symmetric positions share one row).
+
+The file is bounded to max_entries rows; when it grows past that, the least
+recently used rows are evicted. Every read marks its row as used.
+
+Author: Jeremiah Ddumba
+"""
+
+CACHE_FILE = 'search_cache.db'
+DEFAULT_MAX_ENTRIES = 200000
+# Rows evicted at once when the cache is full, so eviction does not run on every store
+EVICTION_BATCH = 1000
+
+
+def to_signed(key):
+    """SQLite integers are signed 64-bit, so store hash keys in that range."""
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class SearchCache:
+    """Root search results in an SQLite file, shared by every engine (and thread) that uses it."""
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        # Searches run on worker threads, so one connection is shared under a lock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS positions ('
+            ' rules TEXT, key INTEGER, depth INTEGER, score REAL, move INTEGER, time_budget REAL,'
+            ' used INTEGER, PRIMARY KEY (rules, key)) WITHOUT ROWID')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS positions_used ON positions (used)')
+        self.connection.commit()
+        self.count, clock = self.connection.execute('SELECT COUNT(*), MAX(used) FROM positions').fetchone()
+        self.clock = clock or 0
+
+    def __len__(self):
+        return self.count
+
+    def get(self, rules, key):
+        """(depth, score, canonical move, time budget) stored for a position, or None."""
+        key = to_signed(key)
+        with self.lock:
+            row = self.connection.execute('SELECT depth, score, move, time_budget FROM positions'
+                                          ' WHERE rules = ? AND key = ?', (rules, key)).fetchone()
+            if row is not None:
+                self.clock += 1
+                self.connection.execute('UPDATE positions SET used = ? WHERE rules = ? AND key = ?',
+                                        (self.clock, rules, key))
+                self.connection.commit()
+        return row
+
+    def put(self, rules, key, depth, score, move, time_budget):
+        """Store a search result unless a deeper one is already cached, evicting old rows when full."""
+        key = to_signed(key)
+        with self.lock:
+            row = self.connection.execute('SELECT depth FROM positions WHERE rules = ? AND key = ?',
+                                          (rules, key)).fetchone()
+            if row is not None and row[0] > depth:
+                return
+            self.clock += 1
+            self.connection.execute('INSERT OR REPLACE INTO positions VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                    (rules, key, depth, score, move, time_budget, self.clock))
+            if row is None:
+                self.count += 1
+            if self.count > self.max_entries:
+                excess = self.count - self.max_entries + EVICTION_BATCH
+                self.connection.execute('DELETE FROM positions WHERE (rules, key) IN'
+                                        ' (SELECT rules, key FROM positions ORDER BY used LIMIT ?)', (excess,))
+                self.count = self.connection.execute('SELECT COUNT(*) FROM positions').fetchone()[0]
+            self.connection.commit()
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute('DELETE FROM positions')
+            self.connection.commit()
+            self.count = 0
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+# Open caches by path, so engines and their snapshots share one connection
+_caches = {}
+
+
+def search_cache(path=CACHE_FILE, max_entries=DEFAULT_MAX_ENTRIES):
+    if path not in _caches:
+        _caches[path] = SearchCache(path, max_entries)
+    return _caches[path]
+
+
+def rules_key(board_size, win_length, misere_mode):
+    """Positions are only comparable under the same rules, so each rule set gets its own keys."""
+    return f"{board_size}x{board_size}/{win_length}{'/misere' if misere_mode else ''}"
@@ -0,0 +1,319 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from tic_tac_toe_engine import TicTacToeEngine, SYMMETRIES, board_hashes, canonical_hash
+from tic_tac_toe_cache import SearchCache
+from tic_tac_toe_tablebase import tablebase, tablebase_results, tablebase_move
+
+"""
+Brute-force cross-check of the Tic-Tac-Toe engine.
+
+Random positions are solved exactly by a plain memoized game-tree walk that shares
+nothing with the engine's search except the win test, and the engine is checked
+against it:
+
+- best moves: the move each search_algorithm picks keeps the position's exact value
+  (3x3, 4x4, and 4x4 with three in a row)
+- analyze_moves: every move is labelled with its exact result
+- tablebase: tablebase_results and tablebase_move agree with the exact values
+- search cache and opening book: a position and its 7 rotations and reflections get
+  equivalent moves, and cached moves keep the exact value
+
+Only positions within reach of the brute force are used, so a run takes a few seconds.
+Exits with status 1 if any check fails.
+
+Usage:
+    python tic_tac_toe_check.py
+    python tic_tac_toe_check.py --positions 50 --seed 3
+
+Author: Jeremiah Ddumba
+"""
+
+# (board size, stones in a row to win, stones already placed in the checked positions)
+SEARCH_CONFIGS = [
+    (3, 3, (0, 1, 2, 3, 4, 5)),
+    (4, 4, (8, 9, 10, 11)),
+    (4, 3, (6, 7, 8)),
+]
+TABLEBASE_STONES = (7, 8, 9, 10)
+BOOK_PLIES = (0, 1, 2, 3)
+
+RESULTS = {1: 'win', 0: 'draw', -1: 'loss'}
+
+
+def make_engine(board_size, win_length):
+    """An engine that searches to the end of the game with nothing precomputed."""
+    engine = TicTacToeEngine(board_size)
+    engine.set_board_size(board_size, win_length)
+    engine.use_tablebase = engine.use_opening_book = False
+    engine.time_budget = None
+    engine.node_budget = None
+    engine.ai_depth = board_size * board_size
+    return engine
+
+
+def load(engine, x_mask, o_mask):
+    """Set up the position given by the two bitboards, with the right player to move."""
+    engine.reset()
+    for i in range(len(engine.board)):
+        engine.board[i] = 'X' if x_mask >> i & 1 else 'O' if o_mask >> i & 1 else ''
+    engine.sync_masks()
+    engine.current_player = 'X' if x_mask.bit_count() == o_mask.bit_count() else 'O'
+
+
+def random_position(rules, rng, stones):
+    """Bitboards of a random unfinished position with this many stones, or None if the game ended."""
+    masks = {'X': 0, 'O': 0}
+    player = 'X'
+    cells = rng.sample(range(rules.board_size ** 2), stones)
+    for i in cells:
+        masks[player] |= 1 << i
+        if rules.mask_wins(masks[player], masks['X'] | masks['O']):
+            return None
+        player = 'O' if player == 'X' else 'X'
+    return masks['X'], masks['O']
+
+
+def random_positions(rules, rng, stones, count):
+    positions = []
+    while len(positions) < count:
+        position = random_position(rules, rng, stones)
+        if position is not None:
+            positions.append(position)
+    return positions
+
+
+def rotate(x_mask, o_mask, perm):
+    """Bitboards of the position with every stone on cell i moved to perm[i]."""
+    x_image = o_image = 0
+    for i, image in enumerate(perm):
+        if x_mask >> i & 1:
+            x_image |= 1 << image
+        if o_mask >> i & 1:
+            o_image |= 1 << image
+    return x_image, o_image
+
+
+# --- Brute Force ---
+def solve(rules, masks, player, memo):
+    """Exact value for player, the side to move: 1 win, 0 draw, -1 loss."""
+    key = (masks['X'], masks['O'])
+    if key in memo:
+        return memo[key]
+    occupied = masks['X'] | masks['O']
+    opponent = 'O' if player == 'X' else 'X'
+    best = -1
+    for i in range(rules.board_size ** 2):
+        if occupied >> i & 1:
+            continue
+        masks[player] |= 1 << i
+        if rules.mask_wins(masks[player], occupied | 1 << i):
+            value = 1
+        elif occupied | 1 << i == rules.full_mask:
+            value = 0
+        else:
+            value = -solve(rules, masks, opponent, memo)
+        masks[player] &= ~(1 << i)
+        best = max(best, value)
+        if best == 1:
+            break
+    memo[key] = best
+    return best
+
+
+def move_values(engine, memo):
+    """{move: exact value for the player to move} for every empty cell of the engine's position."""
+    masks = dict(engine.masks)
+    player = engine.current_player
+    occupied = masks['X'] | masks['O']
+    values = {}
+    for i in engine.empty_indices():
+        masks[player] |= 1 << i
+        if engine.mask_wins(masks[player], occupied | 1 << i):
+            values[i] = 1
+        elif occupied | 1 << i == engine.full_mask:
+            values[i] = 0
+        else:
+            values[i] = -solve(engine, masks, engine.switch_player(player), memo)
+        masks[player] &= ~(1 << i)
+    return values
+
+
+# --- Checks ---
+class Report:
+    """Counts checked positions and prints every failure."""
+    def __init__(self):
+        self.checked = 0
+        self.failures = 0
+
+    def check(self, ok, name, engine, detail):
+        self.checked += 1
+        if not ok:
+            self.failures += 1
+            print(f"FAIL {name}: board {engine.board} ({engine.current_player} to move) {detail}")
+
+
+def check_best_moves(report, rng, count):
+    for board_size, win_length, stone_counts in SEARCH_CONFIGS:
+        for algorithm in ('pvs', 'minimax'):
+            engine = make_engine(board_size, win_length)
+            engine.search_algorithm = algorithm
+            memo = {}
+            start = report.checked
+            for stones in stone_counts:
+                for x_mask, o_mask in random_positions(engine, rng, stones, count):
+                    load(engine, x_mask, o_mask)
+                    values = move_values(engine, memo)
+                    move = engine.minimax_ai()
+                    report.check(move in values and values[move] == max(values.values()),
+                                 f"{board_size}x{board_size}/{win_length} {algorithm} best move", engine,
+                                 f"played {move} ({RESULTS.get(values.get(move))}), best {RESULTS[max(values.values())]}")
+            print(f"best moves  {board_size}x{board_size}/{win_length} {algorithm:8} {report.checked - start} positions")
+
+
+def check_analysis(report, rng, count):
+    for board_size, win_length, stone_counts in SEARCH_CONFIGS:
+        engine = make_engine(board_size, win_length)
+        memo = {}
+        start = report.checked
+        for stones in stone_counts:
+            for x_mask, o_mask in random_positions(engine, rng, stones, count):
+                load(engine, x_mask, o_mask)
+                values = move_values(engine, memo)
+                analysis = engine.analyze_moves()
+                report.check(sorted(entry['move'] for entry in analysis) == sorted(values),
+                             "analyze_moves moves", engine, f"analysed {[entry['move'] for entry in analysis]}")
+                for entry in analysis:
+                    expected = RESULTS[values.get(entry['move'], 0)]
+                    report.check(entry['result'] == expected, "analyze_moves result", engine,
+                                 f"move {entry['move']}: {entry['result']}, expected {expected}")
+                if analysis:
+                    report.check(values.get(analysis[0]['move']) == max(values.values()), "analyze_moves order",
+                                 engine, f"listed {analysis[0]['move']} first")
+        print(f"analysis    {board_size}x{board_size}/{win_length} {report.checked - start} moves and positions")
+
+
+def check_tablebase(report, rng, count):
+    if tablebase(4) is None:
+        print("tablebase   skipped: build it with python tic_tac_toe_tablebase.py --size 4")
+        return
+    engine = make_engine(4, 4)
+    memo = {}
+    start = report.checked
+    for stones in TABLEBASE_STONES:
+        for x_mask, o_mask in random_positions(engine, rng, stones, count):
+            load(engine, x_mask, o_mask)
+            values = move_values(engine, memo)
+            results = tablebase_results(engine)
+            report.check(results is not None and {i: result for i, (result, _) in results.items()} == values,
+                         "tablebase results", engine, f"got {results}, expected {values}")
+            move = tablebase_move(engine)
+            report.check(values.get(move) == max(values.values()), "tablebase move", engine,
+                         f"played {move} ({RESULTS.get(values.get(move))})")
+    print(f"tablebase   4x4/4 {report.checked - start} positions")
+
+
+def equivalent_move(engine, x_mask, o_mask, move, rotated_x, rotated_o, rotated_move):
+    """Whether move in the position and rotated_move in its rotation lead to symmetric positions."""
+    n = engine.board_size
+    player_bit = 1 << move
+    rotated_bit = 1 << rotated_move
+    if engine.current_player == 'X':
+        after = board_hashes(x_mask | player_bit, o_mask, n)
+        rotated_after = board_hashes(rotated_x | rotated_bit, rotated_o, n)
+    else:
+        after = board_hashes(x_mask, o_mask | player_bit, n)
+        rotated_after = board_hashes(rotated_x, rotated_o | rotated_bit, n)
+    return canonical_hash(after) == canonical_hash(rotated_after)
+
+
+def check_cache(report, rng, count):
+    directory = tempfile.mkdtemp()
+    cache = SearchCache(os.path.join(directory, 'search_cache.db'))
+    try:
+        for board_size, win_length, stone_counts in SEARCH_CONFIGS:
+            engine = make_engine(board_size, win_length)
+            engine.search_cache = cache
+            memo = {}
+            start = report.checked
+            for stones in stone_counts:
+                for x_mask, o_mask in random_positions(engine, rng, stones, count):
+                    load(engine, x_mask, o_mask)
+                    values = move_values(engine, memo)
+                    move = engine.minimax_ai()
+                    for perm in SYMMETRIES[board_size]:
+                        rotated_x, rotated_o = rotate(x_mask, o_mask, perm)
+                        load(engine, rotated_x, rotated_o)
+                        cached = engine.cached_move()
+                        if cached is None or engine.board[cached] != '':
+                            report.check(False, "cached move", engine, f"got {cached} for a position searched before")
+                            continue
+                        report.check(equivalent_move(engine, x_mask, o_mask, move, rotated_x, rotated_o, cached),
+                                     "cached move", engine, f"got {cached}, searched move {move} maps to {perm[move]}")
+                        # Rotations carry the exact values along
+                        value = values[perm.index(cached)]
+                        report.check(value == max(values.values()), "cached move value", engine,
+                                     f"got {cached} ({RESULTS[value]})")
+            print(f"cache       {board_size}x{board_size}/{win_length} {report.checked - start} rotated positions")
+    finally:
+        cache.close()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+
+def book_move_here(engine):
+    """The engine's own book lookup, mapped onto the board's orientation."""
+    engine.use_opening_book = True
+    try:
+        return engine.book_move()
+    finally:
+        engine.use_opening_book = False
+
+
+def check_book(report, rng, count):
+    rules = make_engine(5, 5)
+    start = report.checked
+    for plies in BOOK_PLIES:
+        for x_mask, o_mask in random_positions(rules, rng, plies, count):
+            load(rules, x_mask, o_mask)
+            move = book_move_here(rules)
+            if move is None:
+                continue
+            for perm in SYMMETRIES[5]:
+                rotated_x, rotated_o = rotate(x_mask, o_mask, perm)
+                load(rules, rotated_x, rotated_o)
+                rotated_move = book_move_here(rules)
+                report.check(rotated_move is not None and rules.board[rotated_move] == ''
+                             and equivalent_move(rules, x_mask, o_mask, move, rotated_x, rotated_o, rotated_move),
+                             "book move", rules, f"got {rotated_move}, book move {move} maps to {perm[move]}")
+    if report.checked == start:
+        print("book        skipped: no 5x5 opening book positions found")
+    else:
+        print(f"book        5x5/5 {report.checked - start} rotated positions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-check the engine against a brute-force solver")
+    parser.add_argument('--positions', type=int, default=20, help="random positions per configuration and stone count")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    report = Report()
+    start = time.perf_counter()
+    check_best_moves(report, rng, args.positions)
+    check_analysis(report, rng, args.positions)
+    check_tablebase(report, rng, args.positions)
+    check_cache(report, rng, args.positions)
+    check_book(report, rng, args.positions)
+    print(f"{report.checked} checks, {report.failures} failures in {time.perf_counter() - start:.1f}s")
+    if report.failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1132 @@
+import random
+import time
+
+"""
+Headless Tic-Tac-Toe engine.
+
+Holds the rules, move generation, win detection and every AI move function
+(minimax, personalities, learning) with no pygame dependency, so the AI can be
+imported and driven from batch jobs, tests and servers. The pygame UI in
+tic_tac_toe_ai_scoring.py is a thin client built on top of TicTacToeEngine.
+
+Author: Jeremiah Ddumba
+"""
+
+# --- Bitboard Helpers ---
+def build_win_masks(n):
+    """Return the bitmask of every row, column and diagonal on an n x n board."""
+    masks = []
+    for i in range(n):
+        masks.append(sum(1 << (i*n + j) for j in range(n)))
+        masks.append(sum(1 << (j*n + i) for j in range(n)))
+    masks.append(sum(1 << (i*n + i) for i in range(n)))
+    masks.append(sum(1 << (i*n + (n - 1 - i)) for i in range(n)))
+    return masks
+
+# Precomputed win masks for each supported board size
+WIN_MASKS = {n: build_win_masks(n) for n in (3, 4, 5)}
+
+def build_segments(n, k):
+    """Return the bitmask of every run of k cells along a row, column or diagonal of an n x n board."""
+    segments = []
+    for r in range(n):
+        for c in range(n):
+            for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                if 0 <= r + dr * (k - 1) < n and 0 <= c + dc * (k - 1) < n:
+                    segments.append(sum(1 << ((r + dr * j) * n + c + dc * j) for j in range(k)))
+    return segments
+
+# Win masks for k-in-a-row on each board size (k == n gives the same lines as WIN_MASKS),
+# and per cell only the masks through that cell, so a move is checked in O(k)
+SEGMENTS = {(n, k): build_segments(n, k) for n in (3, 4, 5) for k in range(3, n + 1)}
+CELL_SEGMENTS = {key: [[mask for mask in masks if mask >> i & 1] for i in range(key[0] * key[0])]
+                 for key, masks in SEGMENTS.items()}
+
+# --- Symmetry Helpers ---
+def build_symmetries(n):
+    """Return the 8 dihedral symmetries of an n x n board as index permutations (perm[i] = image of i)."""
+    def rotate(r, c):
+        return c, n - 1 - r
+    perms = []
+    for reflect in (False, True):
+        for turns in range(4):
+            perm = []
+            for i in range(n * n):
+                r, c = divmod(i, n)
+                if reflect:
+                    c = n - 1 - c
+                for _ in range(turns):
+                    r, c = rotate(r, c)
+                perm.append(r * n + c)
+            perms.append(perm)
+    return perms
+
+# Precomputed permutation tables for each supported board size
+SYMMETRIES = {n: build_symmetries(n) for n in (3, 4, 5)}
+INVERSE_SYMMETRIES = {n: [[perm.index(i) for i in range(n * n)] for perm in SYMMETRIES[n]] for n in (3, 4, 5)}
+
+# --- Zobrist Hashing ---
+# A fixed seed keeps position keys stable across runs so they can be stored on disk.
+ZOBRIST_SEED = 20241009
+
+def build_zobrist(n):
+    """
+    Random 64-bit keys per (player, cell), pre-permuted for every symmetry:
+    table[player][i][s] is the key of a stone on cell i seen through symmetry s.
+    """
+    rng = random.Random(ZOBRIST_SEED + n)
+    keys = {p: [rng.getrandbits(64) for _ in range(n * n)] for p in ('X', 'O')}
+    return {p: [tuple(keys[p][perm[i]] for perm in SYMMETRIES[n]) for i in range(n * n)]
+            for p in ('X', 'O')}
+
+ZOBRIST = {n: build_zobrist(n) for n in (3, 4, 5)}
+_side_rng = random.Random(ZOBRIST_SEED)
+# Folded into search keys so the same position is stored separately per side/perspective
+ZOBRIST_PLAYER = {'X': _side_rng.getrandbits(64), 'O': _side_rng.getrandbits(64)}
+ZOBRIST_MAXIMIZING = _side_rng.getrandbits(64)
+# Negamax stores side-to-move values, so its entries get their own keys
+ZOBRIST_NEGAMAX = _side_rng.getrandbits(64)
+EMPTY_HASHES = (0,) * 8
+
+def board_hashes(x_mask, o_mask, n):
+    """Zobrist hash of the position under each of the 8 symmetries."""
+    hashes = EMPTY_HASHES
+    for player, mask in (('X', x_mask), ('O', o_mask)):
+        table = ZOBRIST[n][player]
+        while mask:
+            bit = mask & -mask
+            hashes = tuple(h ^ z for h, z in zip(hashes, table[bit.bit_length() - 1]))
+            mask ^= bit
+    return hashes
+
+def canonical_hash(hashes):
+    """Position key shared by all rotations and reflections of a board."""
+    return min(hashes)
+
+def canonical_symmetry(hashes):
+    """Index of the symmetry that maps the board onto its canonical orientation."""
+    return hashes.index(min(hashes))
+
+# --- Game Records ---
+# One byte per move: the cell index, with the high bit set for O
+O_MOVE_FLAG = 0x80
+
+def encode_moves(move_log):
+    """Compact game record of a list of (index, player) moves."""
+    return bytes(index | (O_MOVE_FLAG if player == 'O' else 0) for index, player in move_log)
+
+def decode_moves(record):
+    """Inverse of encode_moves."""
+    return [(byte & ~O_MOVE_FLAG, 'O' if byte & O_MOVE_FLAG else 'X') for byte in record]
+# --- Transposition Table ---
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+# Depth recorded for terminal positions, whose value no deeper search can change
+TERMINAL_DEPTH = 99
+# Half-width of the aspiration window around the previous iteration's score
+ASPIRATION_WINDOW = 25
+# Rough cost of one stored entry (slot pointer + entry tuple + 64-bit key) in bytes
+ENTRY_BYTES = 160
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results. Entries are (key, depth, value, flag, move, generation).
+
+    policy='depth' keeps one slot per index and only lets a search of equal or greater depth
+    (or any search from a newer generation) overwrite it. policy='two_tier' pairs that
+    depth-preferred slot with an always-replace slot, so shallow results still get cached.
+    """
+    def __init__(self, memory_budget=16 * 1024 * 1024, policy='depth'):
+        if policy not in ('depth', 'two_tier'):
+            raise ValueError(f"Unknown replacement policy: {policy}")
+        self.policy = policy
+        tiers = 2 if policy == 'two_tier' else 1
+        self.size = max(1024, memory_budget // (ENTRY_BYTES * tiers))
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        self.deep = [None] * self.size
+        self.recent = [None] * self.size if self.policy == 'two_tier' else None
+        self.probes = 0
+        self.hits = 0
+
+    def new_search(self):
+        """Age existing entries so the next search may replace them freely."""
+        self.generation += 1
+
+    def probe(self, key):
+        self.probes += 1
+        index = key % self.size
+        entry = self.deep[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        if self.recent is not None:
+            entry = self.recent[index]
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry
+        return None
+
+    def store(self, key, depth, value, flag, move=None):
+        index = key % self.size
+        entry = (key, depth, value, flag, move, self.generation)
+        current = self.deep[index]
+        if current is None or current[0] == key or depth >= current[1] or current[5] != self.generation:
+            self.deep[index] = entry
+        elif self.recent is not None:
+            self.recent[index] = entry
+
+    def __len__(self):
+        count = sum(1 for entry in self.deep if entry is not None)
+        if self.recent is not None:
+            count += sum(1 for entry in self.recent if entry is not None)
+        return count
+
+# --- Static Evaluation ---
+# Terminal scores dwarf any heuristic value; wins with more empty cells left (faster wins) score higher
+WIN_SCORE = 1000000
+
+def build_line_weights(n):
+    """Value of an open line holding c of a player's stones: 1, 10, 100, ... so threats dominate."""
+    return [0] + [10 ** (c - 1) for c in range(1, n + 1)]
+
+LINE_WEIGHTS = {n: build_line_weights(n) for n in (3, 4, 5)}
+
+# --- Move Ordering ---
+def build_cell_priority(n):
+    """Static priority of each cell: the number of win lines through it (center and corners first)."""
+    return [sum(1 for mask in WIN_MASKS[n] if mask >> i & 1) for i in range(n * n)]
+
+CELL_PRIORITY = {n: build_cell_priority(n) for n in (3, 4, 5)}
+
+def build_center_cells(n):
+    """The middle cell of an odd board, the four middle cells of an even one."""
+    middle = [n // 2] if n % 2 else [n // 2 - 1, n // 2]
+    return [row * n + col for row in middle for col in middle]
+
+CENTER_CELLS = {n: build_center_cells(n) for n in (3, 4, 5)}
+
+def mcts_available():
+    """The MCTS personality simulates playouts with NumPy, which nothing else in the game needs."""
+    try:
+        import numpy
+    except ImportError:
+        return False
+    return True
+
+# --- Difficulty ---
+# Weaker levels are the same search with a small budget: (node budget, time cap in seconds,
+# random noise added to each root move's score). Hard is absent and searches at full strength.
+DIFFICULTY_LEVELS = {
+    'Easy': (30, 0.05, 200),
+    'Medium': (1500, 0.25, 10),
+}
+
+class MoveOrdering:
+    """
+    Orders moves for alpha-beta search: the transposition-table move first, then killer
+    moves for the current ply, then the history heuristic, then static cell priority.
+    Each heuristic can be switched off to measure its effect. History scores persist
+    across the moves of a game; killers are per search.
+    """
+    def __init__(self, board_size, static=True, killers=True, history=True):
+        self.board_size = board_size
+        self.use_static = static
+        self.use_killers = killers
+        self.use_history = history
+        self.priority = CELL_PRIORITY[board_size] if static else [0] * (board_size * board_size)
+        self.new_game()
+
+    def new_game(self):
+        self.history = [0] * (self.board_size * self.board_size)
+        self.new_search()
+
+    def new_search(self):
+        self.killers = [[None, None] for _ in range(self.board_size * self.board_size + 1)]
+
+    def order(self, moves, ply, tt_move=None):
+        killers = self.killers[ply] if self.use_killers else ()
+        history = self.history
+        priority = self.priority
+        moves.sort(key=lambda m: (m == tt_move, m in killers, history[m], priority[m]), reverse=True)
+        return moves
+
+    def record_cutoff(self, move, ply, depth):
+        """Remember a move that caused a beta cutoff."""
+        if self.use_killers:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        if self.use_history:
+            self.history[move] += depth * depth
+
+
+class SearchTimeout(Exception):
+    """Raised inside minimax when the per-move time or node budget runs out or a stop is requested."""
+
+
+class TicTacToeEngine:
+    # State copied by snapshot(); containers that describe the position are copied,
+    # search tables and learned data are shared with the original engine.
+    SNAPSHOT_ATTRIBUTES = (
+        'board_size', 'win_length', 'win_masks', 'cell_win_masks', 'misere_mode', 'board', 'masks', 'hashes', 'full_mask',
+        'current_player', 'last_move', 'move_log', 'redo_log', 'difficulty', 'ai_depth', 'time_budget', 'node_budget',
+        'search_workers', 'search_algorithm', 'ai_personality', 'memoization', 'ordering_factory', 'move_ordering',
+        'mcts_playouts', 'mcts', 'use_opening_book', 'use_tablebase', 'ponder_results',
+        'search_cache', 'learning_dir',
+    )
+
+    def __init__(self, board_size=3, misere_mode=False, tt_memory=16 * 1024 * 1024, tt_policy='depth',
+                 ordering_factory=MoveOrdering):
+        # Game configuration
+        self.board_size = board_size
+        self.win_length = self.board_size
+        self.win_masks = SEGMENTS[(self.board_size, self.win_length)]
+        self.cell_win_masks = CELL_SEGMENTS[(self.board_size, self.win_length)]
+        self.misere_mode = misere_mode
+        self.board = [''] * (self.board_size * self.board_size)
+        # Bitboard state: one integer mask per player, kept in sync with self.board
+        self.masks = {'X': 0, 'O': 0}
+        self.hashes = EMPTY_HASHES
+        self.full_mask = (1 << len(self.board)) - 1
+        self.current_player = 'X'
+        self.last_move = None
+        # Moves played since reset() as (index, player), and moves taken back that can be replayed
+        self.move_log = []
+        self.redo_log = []
+
+        # AI configuration
+        self.difficulty = 'Easy'
+        self.ai_depth = 9
+        # Per-move search budget for iterative deepening (None disables that limit)
+        self.time_budget = 1.0
+        self.node_budget = None
+        # Root moves are split across this many processes when greater than 1 (headless use only,
+        # see tic_tac_toe_parallel.py; the pygame UI always searches in-process)
+        self.search_workers = 1
+        # 'pvs' (negamax principal variation search) or 'minimax', the plain alpha-beta reference
+        self.search_algorithm = 'pvs'
+        self.ai_personality = 'Balanced'
+        # MCTS personality: random playouts per move, and the search tree reused between moves
+        self.mcts_playouts = 20000
+        self.mcts = None
+        # Play from the precomputed opening book (tic_tac_toe_book.py) when one has been built
+        self.use_opening_book = True
+        # Play perfectly from a solved tablebase (tic_tac_toe_tablebase.py) when one has been built
+        self.use_tablebase = True
+        # Best moves found by ponder() for positions the opponent may move into, keyed by hashes
+        self.ponder_results = {}
+        # Root search results kept across games and sessions (tic_tac_toe_cache.SearchCache), or None
+        self.search_cache = None
+        # Directory of the player's own learned values (tic_tac_toe_learning.user_learning_path);
+        # None keeps what is learned in memory and never touches the shipped tables
+        self.learning_dir = None
+
+        # Bounded transposition table for minimax, keyed by symmetry-canonical Zobrist hash
+        self.memoization = TranspositionTable(tt_memory, tt_policy)
+        self.search_nodes = 0
+        self.search_depth = 0
+        self.search_score = 0
+        self.search_deadline = None
+        self.search_node_limit = None
+        self.search_root_stones = 0
+        self.search_pv = []
+        self.stop_requested = False
+
+        # Move ordering is pluggable: ordering_factory(board_size) returns a MoveOrdering-like object
+        self.ordering_factory = ordering_factory
+        self.move_ordering = ordering_factory(self.board_size)
+
+    # ===== Rules and Board State =====
+
+    def reset(self):
+        """Clear the board and per-game search state."""
+        self.board = [''] * (self.board_size * self.board_size)
+        self.full_mask = (1 << len(self.board)) - 1
+        self.win_masks = SEGMENTS[(self.board_size, self.win_length)]
+        self.cell_win_masks = CELL_SEGMENTS[(self.board_size, self.win_length)]
+        self.sync_masks()
+        self.current_player = 'X'
+        self.last_move = None
+        self.move_log = []
+        self.redo_log = []
+        self.memoization.clear()
+        self.move_ordering = self.ordering_factory(self.board_size)
+        self.mcts = None
+        self.ponder_results.clear()
+
+    def snapshot(self):
+        """Independent copy of the position and AI settings, e.g. for searching on a worker thread."""
+        engine = TicTacToeEngine.__new__(TicTacToeEngine)
+        for name in self.SNAPSHOT_ATTRIBUTES:
+            setattr(engine, name, getattr(self, name))
+        engine.board = self.board.copy()
+        engine.masks = dict(self.masks)
+        engine.move_log = self.move_log.copy()
+        engine.redo_log = []
+        engine.search_nodes = 0
+        engine.search_depth = 0
+        engine.search_score = 0
+        engine.search_deadline = None
+        engine.search_node_limit = None
+        engine.search_root_stones = 0
+        engine.search_pv = []
+        engine.stop_requested = False
+        return engine
+
+    def request_stop(self):
+        """Ask a running search (possibly on another thread) to stop at its next budget check."""
+        self.stop_requested = True
+
+    def set_board_size(self, size, win_length=None):
+        """Change the board; win_length stones in a row win (default: a full line)."""
+        if win_length is not None and not 3 <= win_length <= size:
+            raise ValueError(f"Win length must be between 3 and {size}")
+        self.board_size = size
+        self.win_length = win_length or size
+        self.reset()
+
+    def empty_indices(self):
+        return [i for i, x in enumerate(self.board) if x == '']
+
+    def place(self, index):
+        """Put the current player's stone on index. Returns False if the cell is taken."""
+        if self.board[index] != '':
+            return False
+        self.board[index] = self.current_player
+        self.masks[self.current_player] |= 1 << index
+        self.hashes = tuple(h ^ z for h, z in zip(self.hashes, ZOBRIST[self.board_size][self.current_player][index]))
+        self.last_move = index
+        self.move_log.append((index, self.current_player))
+        return True
+
+    def unplace(self):
+        """Take back the last move in place. Returns its (index, player)."""
+        index, player = self.move_log.pop()
+        self.board[index] = ''
+        self.masks[player] &= ~(1 << index)
+        self.hashes = tuple(h ^ z for h, z in zip(self.hashes, ZOBRIST[self.board_size][player][index]))
+        self.last_move = self.move_log[-1][0] if self.move_log else None
+        return index, player
+
+    def undo(self):
+        """Take back the last move and make it replayable with redo(). Returns False if there is none."""
+        if not self.move_log:
+            return False
+        index, player = self.unplace()
+        self.redo_log.append((index, player))
+        self.current_player = player
+        return True
+
+    def redo(self):
+        """Replay the last move taken back by undo(). Returns False if there is none."""
+        if not self.redo_log:
+            return False
+        index, player = self.redo_log.pop()
+        self.current_player = player
+        self.place(index)
+        self.switch_turns()
+        return True
+
+    def jump_to_ply(self, ply):
+        """Undo or redo until exactly ply moves are on the board (as far as the logs allow)."""
+        while len(self.move_log) > ply and self.undo():
+            pass
+        while len(self.move_log) < ply and self.redo():
+            pass
+
+    def game_record(self):
+        """The moves of the game so far as a compact record, one byte per move."""
+        return encode_moves(self.move_log)
+
+    def load_game_record(self, record):
+        """Reset and replay a record from game_record(); the moves stay on the board."""
+        self.reset()
+        for index, player in decode_moves(record):
+            self.current_player = player
+            self.place(index)
+        if self.move_log:
+            self.current_player = self.switch_player(self.move_log[-1][1])
+
+    def is_full(self):
+        return '' not in self.board
+
+    def switch_player(self, player):
+        return 'O' if player == 'X' else 'X'
+
+    def switch_turns(self):
+        self.current_player = self.switch_player(self.current_player)
+
+    def sync_masks(self):
+        """Rebuild the per-player bitboards from self.board."""
+        self.masks = {'X': 0, 'O': 0}
+        for i, cell in enumerate(self.board):
+            if cell != '':
+                self.masks[cell] |= 1 << i
+        self.hashes = board_hashes(self.masks['X'], self.masks['O'], self.board_size)
+
+    def mask_wins(self, mask, occupied):
+        """Bitboard win test: mask holds the player's stones, occupied holds every stone."""
+        win = False
+        for win_mask in self.win_masks:
+            if mask & win_mask == win_mask:
+                win = True
+                break
+        if self.misere_mode:
+            return not win and occupied != 0
+        else:
+            return win
+
+    def mask_wins_at(self, mask, occupied, index):
+        """
+        mask_wins for a position whose only possible new line goes through index, the
+        stone just placed: only the win masks through that cell are examined.
+        """
+        win = False
+        for win_mask in self.cell_win_masks[index]:
+            if mask & win_mask == win_mask:
+                win = True
+                break
+        if self.misere_mode:
+            return not win and occupied != 0
+        else:
+            return win
+
+    def mask_wins_after(self, player, index):
+        """Check whether placing player's stone at index would win, without touching the board."""
+        occupied = self.masks['X'] | self.masks['O']
+        return self.mask_wins_at(self.masks[player] | (1 << index), occupied | (1 << index), index)
+
+    def last_move_wins(self):
+        """Whether the stone placed by the last place() ended the game for the player who placed it."""
+        player = self.board[self.last_move]
+        return self.mask_wins_at(self.masks[player], self.masks['X'] | self.masks['O'], self.last_move)
+
+    def check_winner(self, board, player):
+        mask = 0
+        occupied = 0
+        for i, cell in enumerate(board):
+            if cell != '':
+                occupied |= 1 << i
+                if cell == player:
+                    mask |= 1 << i
+        return self.mask_wins(mask, occupied)
+
+    # ===== AI Move Selection =====
+
+    def choose_move(self):
+        """Pick the AI's move for the current player according to difficulty and personality."""
+        empty_indices = self.empty_indices()
+        if not empty_indices:
+            return None
+
+        if self.difficulty in DIFFICULTY_LEVELS:
+            return self.budgeted_move(*DIFFICULTY_LEVELS[self.difficulty])
+        elif self.ai_personality == 'Aggressive':
+            return self.aggressive_move(empty_indices)
+        elif self.ai_personality == 'Defensive':
+            return self.defensive_move(empty_indices)
+        elif self.ai_personality == 'Learning':
+            return self.learning_move(empty_indices)
+        elif self.ai_personality == 'MCTS':
+            return self.mcts_move()
+        else:
+            return self.minimax_ai()
+
+    def aggressive_move(self, empty_indices):
+        for index in empty_indices:
+            if self.mask_wins_after(self.current_player, index):
+                return index
+        return random.choice(empty_indices)
+
+    def defensive_move(self, empty_indices):
+        opponent = self.switch_player(self.current_player)
+        for index in empty_indices:
+            if self.mask_wins_after(opponent, index):
+                return index
+        return random.choice(empty_indices)
+
+    def block_player(self, empty_indices):
+        for index in empty_indices:
+            if self.mask_wins_after(self.current_player, index):
+                return index
+        opponent = self.switch_player(self.current_player)
+        for index in empty_indices:
+            if self.mask_wins_after(opponent, index):
+                return index
+        for index in CENTER_CELLS[self.board_size]:
+            if index in empty_indices:
+                return index
+        return random.choice(empty_indices)
+
+    def budgeted_move(self, node_budget, time_budget, noise=0):
+        """
+        Search within a fixed budget, skipping the book and tablebase, and pick the root move
+        with the best score plus up to noise of random jitter. Latency is bounded by the
+        budget on every board size, and strength grows with it.
+        """
+        return self.iterative_deepening(time_budget=time_budget, node_budget=node_budget, noise=noise)
+
+    def minimax_ai(self):
+        move = self.precomputed_move()
+        if move is not None:
+            # No search ran, so there is no expected line beyond the move itself
+            self.search_pv = [move]
+            return move
+        if self.search_workers > 1:
+            # Imported lazily so the engine itself never pays for multiprocessing
+            from tic_tac_toe_parallel import parallel_search
+            move = parallel_search(self, self.search_workers)
+        else:
+            move = self.iterative_deepening()
+        self.remember_search(move)
+        return move
+
+    def precomputed_move(self):
+        """Move from the tablebase, the opening book or an earlier ponder search, or None if none covers this position."""
+        # The tablebase and the book are built for full-line wins only, and the tablebase for normal rules
+        standard_rules = self.win_length == self.board_size
+        if self.use_tablebase and standard_rules and not self.misere_mode:
+            # Imported lazily like the opening book; the file is only mapped once a lookup needs it
+            from tic_tac_toe_tablebase import tablebase_move
+            table_move = tablebase_move(self)
+            if table_move is not None:
+                return table_move
+        book_move = self.book_move() if standard_rules else None
+        if book_move is not None:
+            return book_move
+        if self.hashes in self.ponder_results:
+            return self.ponder_results[self.hashes]
+        return self.cached_move()
+
+    def cache_key(self):
+        """(rules, key) of the current position in the persistent search cache."""
+        from tic_tac_toe_cache import rules_key
+        rules = rules_key(self.board_size, self.win_length, self.misere_mode)
+        return rules, canonical_hash(self.hashes) ^ ZOBRIST_PLAYER[self.current_player]
+
+    def cached_move(self):
+        """
+        Move from the persistent search cache, or None. A stored result is only used if it
+        is as good as a new search would be: deep enough, decisive, or found with at least
+        the current time budget.
+        """
+        if self.search_cache is None:
+            return None
+        entry = self.search_cache.get(*self.cache_key())
+        if entry is None:
+            return None
+        depth, score, move, time_budget = entry
+        deep_enough = depth >= min(self.ai_depth, len(self.empty_indices())) or abs(score) >= WIN_SCORE
+        # None stands for no time limit on either side
+        same_budget = self.node_budget is None and self.time_budget is not None \
+            and (time_budget is None or time_budget >= self.time_budget)
+        if not deep_enough and not same_budget:
+            return None
+        return INVERSE_SYMMETRIES[self.board_size][canonical_symmetry(self.hashes)][move]
+
+    def remember_search(self, move):
+        """Store the result of the search that just finished in the persistent cache."""
+        # Stopped and node-limited searches say nothing about what the time budget can reach
+        if self.search_cache is None or move is None or self.search_depth == 0 \
+                or self.stop_requested or self.node_budget is not None:
+            return
+        symmetry = canonical_symmetry(self.hashes)
+        self.search_cache.put(*self.cache_key(), self.search_depth, self.search_score,
+                              SYMMETRIES[self.board_size][symmetry][move], self.time_budget)
+
+    def ponder(self):
+        """
+        Search on the opponent's time: for each likely reply, best first, search the position
+        it leads to and keep the move in ponder_results, until stop_requested is set. Meant to
+        run on a snapshot from a worker thread; the snapshot shares ponder_results and the
+        transposition table, so even unfinished searches speed up the real one.
+        """
+        self.ponder_results.clear()
+        # The reply our last search expected is stored with the opponent-to-move position
+        expected = self.stored_move(self.hashes, self.current_player,
+                                    root_player=self.switch_player(self.current_player))
+        replies = self.move_ordering.order(self.empty_indices(), 0, expected)
+        for reply in replies:
+            if self.stop_requested:
+                break
+            self.place(reply)
+            if not self.last_move_wins() and not self.is_full():
+                self.switch_turns()
+                if self.precomputed_move() is None:
+                    move = self.iterative_deepening()
+                    # A stopped search is incomplete, but its table entries are kept
+                    if not self.stop_requested:
+                        self.ponder_results[self.hashes] = move
+                        self.remember_search(move)
+                self.switch_turns()
+            self.unplace()
+
+    def book_move(self):
+        """Move from the opening book for the current position, or None when it is not covered."""
+        if not self.use_opening_book:
+            return None
+        # The book module maps its file on first use, so engines that never need it pay nothing
+        from tic_tac_toe_book import lookup_book_move
+        move = lookup_book_move(self.board_size, self.misere_mode, self.hashes)
+        if move is None:
+            return None
+        # Book moves are stored in the canonical orientation, so map them back onto this board
+        return INVERSE_SYMMETRIES[self.board_size][canonical_symmetry(self.hashes)][move]
+
+    def begin_search(self, time_budget=None, node_budget=None):
+        """Reset counters and arm the budget checks before a search from the current position."""
+        self.search_nodes = 0
+        self.search_depth = 0
+        self.search_score = 0
+        self.search_deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        self.search_node_limit = node_budget
+        self.search_root_stones = (self.masks['X'] | self.masks['O']).bit_count()
+        self.memoization.new_search()
+        self.move_ordering.new_search()
+
+    def end_search(self):
+        self.search_deadline = None
+        self.search_node_limit = None
+
+    def iterative_deepening(self, max_depth=None, time_budget=None, node_budget=None, noise=0):
+        """
+        Search depth 1, 2, ... until the budget runs out and return the best move of the
+        deepest completed iteration. Each iteration tries the previous best move first and,
+        under PVS, starts from a narrow window around the previous score.
+        """
+        if max_depth is None:
+            max_depth = self.ai_depth
+        if time_budget is None:
+            time_budget = self.time_budget
+        if node_budget is None:
+            node_budget = self.node_budget
+        empty_indices = self.empty_indices()
+        if not empty_indices:
+            return None
+
+        self.begin_search(time_budget, node_budget)
+        best_move = empty_indices[0]
+        score = None
+        try:
+            # Searching deeper than the number of empty cells cannot change the result
+            for depth in range(1, min(max_depth, len(empty_indices)) + 1):
+                if self.search_algorithm == 'pvs' and score is not None and not noise:
+                    # Aspiration window around the last score; a result outside it is only a bound
+                    alpha, beta = score - ASPIRATION_WINDOW, score + ASPIRATION_WINDOW
+                    move, score = self.search_root(depth, best_move, alpha, beta)
+                    if score <= alpha or score >= beta:
+                        move, score = self.search_root(depth, best_move)
+                else:
+                    move, score = self.search_root(depth, best_move, noise=noise)
+                best_move = move
+                self.search_depth = depth
+                self.search_score = score
+                if abs(score) >= WIN_SCORE:
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self.end_search()
+        self.search_pv = self.principal_variation(best_move)
+        return best_move
+
+    def search_root(self, depth, first_move=None, alpha=-float('inf'), beta=float('inf'), noise=0, scores=None):
+        """
+        One fixed-depth search of every root move. Returns (best_move, best_score). With noise,
+        or a scores dict to fill in, every move gets an exact score; noise then picks the best
+        one after random jitter.
+        """
+        exact = noise or scores is not None
+        best_score = -float('inf')
+        best_value = -float('inf')
+        best_move = None
+        masks = dict(self.masks)
+        zobrist = ZOBRIST[self.board_size][self.current_player]
+        opponent = self.switch_player(self.current_player)
+        moves = self.move_ordering.order(self.empty_indices(), 0, first_move)
+        for i in moves:
+            masks[self.current_player] |= 1 << i
+            hashes = tuple(h ^ z for h, z in zip(self.hashes, zobrist[i]))
+            # Without noise the other moves only have to be shown worse than the best so far
+            lower = alpha if exact else max(alpha, best_score)
+            if self.search_algorithm == 'minimax':
+                score = self.minimax(masks, opponent, False, depth - 1,
+                                     alpha=lower, beta=beta, hashes=hashes, last_move=i)
+            else:
+                if best_move is None or exact:
+                    score = -self.negamax(masks, opponent, depth - 1, -beta, -lower, hashes, i)
+                else:
+                    score = -self.negamax(masks, opponent, depth - 1, -lower - 1, -lower, hashes, i)
+                    if lower < score < beta:
+                        score = -self.negamax(masks, opponent, depth - 1, -beta, -lower, hashes, i)
+            masks[self.current_player] &= ~(1 << i)
+            if scores is not None:
+                scores[i] = score
+            value = score + random.uniform(-noise, noise) if noise else score
+            if value > best_value:
+                best_value, best_score, best_move = value, score, i
+            if best_score >= beta:
+                break
+        return best_move, best_score
+
+    def analyze_moves(self, max_depth=None, time_budget=None, node_budget=None):
+        """
+        Score every legal move in one iterative-deepening search, so the root moves share the
+        transposition table. Returns one dict per move, best first: 'move', 'score' (None if
+        not even depth 1 finished), 'result' ('win', 'draw', 'loss', or None while the outcome
+        is beyond the search horizon) and 'pv', the line expected after the move.
+        """
+        if max_depth is None:
+            max_depth = self.ai_depth
+        if time_budget is None:
+            time_budget = self.time_budget
+        if node_budget is None:
+            node_budget = self.node_budget
+        if self.use_tablebase and self.win_length == self.board_size and not self.misere_mode:
+            analysis = self.tablebase_analysis()
+            if analysis is not None:
+                return analysis
+        empty_indices = self.empty_indices()
+        self.begin_search(time_budget, node_budget)
+        scores = {}
+        best_move = None
+        try:
+            for depth in range(1, min(max_depth, len(empty_indices)) + 1):
+                depth_scores = {}
+                best_move, _ = self.search_root(depth, best_move, scores=depth_scores)
+                scores = depth_scores
+                self.search_depth = depth
+                if all(abs(score) >= WIN_SCORE for score in scores.values()):
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self.end_search()
+
+        # Once the search reaches the last empty cell every leaf is a finished game, so 0 is a draw
+        solved = self.search_depth >= len(empty_indices)
+        analysis = []
+        for move in empty_indices:
+            score = scores.get(move)
+            if score is None:
+                result = None
+            elif score >= WIN_SCORE:
+                result = 'win'
+            elif score <= -WIN_SCORE:
+                result = 'loss'
+            else:
+                result = 'draw' if solved else None
+            pv = self.principal_variation(move) if score is not None else [move]
+            analysis.append({'move': move, 'score': score, 'result': result, 'pv': pv})
+        analysis.sort(key=lambda entry: -float('inf') if entry['score'] is None else entry['score'], reverse=True)
+        if analysis:
+            self.search_pv = analysis[0]['pv']
+        return analysis
+
+    def tablebase_analysis(self):
+        """analyze_moves() answered exactly from the tablebase, or None when it does not cover the position."""
+        from tic_tac_toe_tablebase import tablebase_results, tablebase_move, WIN, LOSS
+        results = tablebase_results(self)
+        if results is None:
+            return None
+        empty_count = len(self.empty_indices())
+        names = {WIN: 'win', LOSS: 'loss'}
+        analysis = []
+        for move, (result, plies) in results.items():
+            # Scored like the search: a result with more empty cells left is a faster one
+            score = 0 if result not in names else result * (WIN_SCORE + empty_count - plies)
+            # The expected line is the tablebase's best play from both sides
+            line = self.snapshot()
+            line.place(move)
+            pv = [move]
+            while not line.last_move_wins() and not line.is_full():
+                line.switch_turns()
+                reply = tablebase_move(line)
+                if reply is None:
+                    break
+                line.place(reply)
+                pv.append(reply)
+            analysis.append({'move': move, 'score': score, 'result': names.get(result, 'draw'), 'pv': pv})
+        analysis.sort(key=lambda entry: entry['score'], reverse=True)
+        if analysis:
+            self.search_pv = analysis[0]['pv']
+        return analysis
+
+    def search_key(self, hashes, player, root_player=None):
+        """Transposition-table key of a position with player to move, in a search rooted at root_player."""
+        key = min(hashes) ^ ZOBRIST_PLAYER[player]
+        if self.search_algorithm == 'pvs':
+            return key ^ ZOBRIST_NEGAMAX
+        # Minimax maximizes exactly at the nodes where the root player is to move
+        return key ^ ZOBRIST_MAXIMIZING if player == (root_player or self.current_player) else key
+
+    def stored_move(self, hashes, player, root_player=None):
+        """Best move the transposition table holds for this position, mapped onto the board, or None."""
+        entry = self.memoization.probe(self.search_key(hashes, player, root_player))
+        if entry is None or entry[4] is None:
+            return None
+        return INVERSE_SYMMETRIES[self.board_size][canonical_symmetry(hashes)][entry[4]]
+
+    def principal_variation(self, first_move, max_length=None):
+        """The line the last search expects after first_move, read back from the transposition table."""
+        if max_length is None:
+            max_length = max(self.search_depth, 1)
+        masks = dict(self.masks)
+        hashes = self.hashes
+        player = self.current_player
+        pv = []
+        move = first_move
+        while move is not None and len(pv) < max_length:
+            pv.append(move)
+            masks[player] |= 1 << move
+            hashes = tuple(h ^ z for h, z in zip(hashes, ZOBRIST[self.board_size][player][move]))
+            occupied = masks['X'] | masks['O']
+            if self.mask_wins_at(masks[player], occupied, move) or occupied == self.full_mask:
+                break
+            player = self.switch_player(player)
+            move = self.stored_move(hashes, player)
+            if move is not None and occupied >> move & 1:
+                break
+        return pv
+
+    def negamax(self, masks, player, depth, alpha, beta, hashes, last_move=None):
+        """
+        Principal variation search. Returns the value for player, the side to move.
+        The first (best-ordered) move gets the full window; the rest get a null window
+        and are searched again only if they might beat it.
+        """
+        self.search_nodes += 1
+        if self.search_nodes & 1023 == 0 and (self.stop_requested or self.search_deadline is not None
+                                              and time.perf_counter() > self.search_deadline):
+            raise SearchTimeout()
+        if self.search_node_limit is not None and self.search_nodes > self.search_node_limit:
+            raise SearchTimeout()
+        key = min(hashes) ^ ZOBRIST_PLAYER[player] ^ ZOBRIST_NEGAMAX
+        entry = self.memoization.probe(key)
+        if entry is not None and entry[1] >= depth:
+            value, flag = entry[2], entry[3]
+            if flag == EXACT:
+                return value
+            elif flag == LOWER_BOUND:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        opponent = self.switch_player(player)
+        occupied = masks['X'] | masks['O']
+        if last_move is not None:
+            won = self.mask_wins_at(masks[opponent], occupied, last_move)
+        else:
+            won = self.mask_wins(masks[opponent], occupied)
+        if won:
+            # The opponent has just won; sooner losses are worse
+            score = -(WIN_SCORE + (self.full_mask ^ occupied).bit_count())
+            self.memoization.store(key, TERMINAL_DEPTH, score, EXACT)
+            return score
+        elif occupied == self.full_mask:
+            return 0
+        elif depth == 0:
+            value = self.evaluate(masks)
+            return value if player == self.current_player else -value
+
+        alpha_orig = alpha
+        zobrist = ZOBRIST[self.board_size][player]
+        n = self.board_size
+        symmetry = hashes.index(min(hashes))
+        tt_move = None
+        if entry is not None and entry[4] is not None:
+            tt_move = INVERSE_SYMMETRIES[n][symmetry][entry[4]]
+        ply = occupied.bit_count() - self.search_root_stones
+        moves = [i for i in range(n * n) if not occupied >> i & 1]
+        self.move_ordering.order(moves, ply, tt_move)
+        best_value = -float('inf')
+        best_move = None
+        for i in moves:
+            bit = 1 << i
+            masks[player] |= bit
+            child = tuple(h ^ z for h, z in zip(hashes, zobrist[i]))
+            if best_move is None:
+                value = -self.negamax(masks, opponent, depth - 1, -beta, -alpha, child, i)
+            else:
+                value = -self.negamax(masks, opponent, depth - 1, -alpha - 1, -alpha, child, i)
+                if alpha < value < beta:
+                    value = -self.negamax(masks, opponent, depth - 1, -beta, -alpha, child, i)
+            masks[player] &= ~bit
+            if value > best_value:
+                best_value, best_move = value, i
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                self.move_ordering.record_cutoff(i, ply, depth)
+                break
+
+        if best_value <= alpha_orig:
+            flag = UPPER_BOUND
+        elif best_value >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.memoization.store(key, depth, best_value, flag, SYMMETRIES[n][symmetry][best_move])
+        return best_value
+
+    def minimax(self, masks, player, is_maximizing, depth, alpha=-float('inf'), beta=float('inf'), hashes=None,
+                last_move=None):
+        self.search_nodes += 1
+        if self.search_nodes & 1023 == 0 and (self.stop_requested or self.search_deadline is not None
+                                              and time.perf_counter() > self.search_deadline):
+            raise SearchTimeout()
+        if self.search_node_limit is not None and self.search_nodes > self.search_node_limit:
+            raise SearchTimeout()
+        if hashes is None:
+            hashes = board_hashes(masks['X'], masks['O'], self.board_size)
+        key = min(hashes) ^ ZOBRIST_PLAYER[player]
+        if is_maximizing:
+            key ^= ZOBRIST_MAXIMIZING
+        entry = self.memoization.probe(key)
+        if entry is not None and entry[1] >= depth:
+            # Bounds from earlier searches narrow the window; only exact values return directly
+            value, flag = entry[2], entry[3]
+            if flag == EXACT:
+                return value
+            elif flag == LOWER_BOUND:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        opponent = self.switch_player(player)
+        occupied = masks['X'] | masks['O']
+        # Only the opponent's last stone can have completed a line
+        if last_move is not None:
+            won = self.mask_wins_at(masks[opponent], occupied, last_move)
+        else:
+            won = self.mask_wins(masks[opponent], occupied)
+        if won:
+            score = WIN_SCORE + (self.full_mask ^ occupied).bit_count()
+            if opponent != self.current_player:
+                score = -score
+            self.memoization.store(key, TERMINAL_DEPTH, score, EXACT)
+            return score
+        elif occupied == self.full_mask:
+            return 0
+        elif depth == 0:
+            return self.evaluate(masks)
+
+        alpha_orig, beta_orig = alpha, beta
+        zobrist = ZOBRIST[self.board_size][player]
+        n = self.board_size
+        # TT moves are stored in the canonical orientation of the position
+        symmetry = hashes.index(min(hashes))
+        tt_move = None
+        if entry is not None and entry[4] is not None:
+            tt_move = INVERSE_SYMMETRIES[n][symmetry][entry[4]]
+        ply = occupied.bit_count() - self.search_root_stones
+        moves = [i for i in range(n * n) if not occupied >> i & 1]
+        self.move_ordering.order(moves, ply, tt_move)
+        best_move = None
+        if is_maximizing:
+            best_eval = -float('inf')
+            for i in moves:
+                bit = 1 << i
+                masks[player] |= bit
+                child = tuple(h ^ z for h, z in zip(hashes, zobrist[i]))
+                eval = self.minimax(masks, opponent, False, depth - 1, alpha, beta, child, i)
+                masks[player] &= ~bit
+                if eval > best_eval:
+                    best_eval, best_move = eval, i
+                alpha = max(alpha, eval)
+                if beta <= alpha:
+                    self.move_ordering.record_cutoff(i, ply, depth)
+                    break
+        else:
+            best_eval = float('inf')
+            for i in moves:
+                bit = 1 << i
+                masks[player] |= bit
+                child = tuple(h ^ z for h, z in zip(hashes, zobrist[i]))
+                eval = self.minimax(masks, opponent, True, depth - 1, alpha, beta, child, i)
+                masks[player] &= ~bit
+                if eval < best_eval:
+                    best_eval, best_move = eval, i
+                beta = min(beta, eval)
+                if beta <= alpha:
+                    self.move_ordering.record_cutoff(i, ply, depth)
+                    break
+
+        if best_eval <= alpha_orig:
+            flag = UPPER_BOUND
+        elif best_eval >= beta_orig:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.memoization.store(key, depth, best_eval, flag, SYMMETRIES[n][symmetry][best_move])
+        return best_eval
+
+    def mcts_move(self):
+        # NumPy is only needed by this personality, so import it on first use; without it, search instead
+        try:
+            from tic_tac_toe_mcts import MonteCarloTreeSearch
+        except ImportError as e:
+            print("MCTS unavailable, using minimax:", e)
+            return self.minimax_ai()
+        if self.mcts is None or self.mcts.board_size != self.board_size or self.mcts.misere_mode != self.misere_mode \
+                or self.mcts.win_length != self.win_length:
+            self.mcts = MonteCarloTreeSearch(self.board_size, self.misere_mode, self.win_length)
+        return self.mcts.search(self, self.mcts_playouts, self.time_budget)
+
+    def evaluate(self, masks):
+        """
+        Heuristic score of a non-terminal position from the root player's point of view.
+        Every line still open to only one player adds that player LINE_WEIGHTS[stones];
+        per-line counts come from one pass of popcounts over the precomputed line masks.
+        """
+        mine = masks[self.current_player]
+        theirs = masks[self.switch_player(self.current_player)]
+        weights = LINE_WEIGHTS[self.board_size]
+        score = 0
+        for line in self.win_masks:
+            my_count = (mine & line).bit_count()
+            their_count = (theirs & line).bit_count()
+            if not their_count:
+                score += weights[my_count]
+            elif not my_count:
+                score -= weights[their_count]
+        # In misère mode completing lines is what loses
+        return -score if self.misere_mode else score
+
+    def learning_move(self, empty_indices):
+        """Move into the afterstate with the best learned value; search when nothing here has been learned."""
+        # The learned table lives on disk and is only mapped once the Learning personality plays
+        from tic_tac_toe_learning import learning_table, greedy_move
+        # Tables are trained for full-line wins only
+        if self.win_length != self.board_size:
+            return self.minimax_ai()
+        table = learning_table(self.board_size, self.misere_mode, self.learning_dir)
+        move = greedy_move(table, self.board_size, self.hashes, self.current_player, empty_indices)
+        if move is None:
+            return self.minimax_ai()
+        return move
+
+    def record_learning_game(self, moves, winner):
+        """Learn from a finished game given as its move indices from X's first move and its winner ('X', 'O' or '')."""
+        from tic_tac_toe_learning import learning_table
+        if self.win_length != self.board_size:
+            return
+        learning_table(self.board_size, self.misere_mode, self.learning_dir).learn_game(self.board_size, moves, winner)
+
+    def save_learning(self):
+        """Write what was learned this session to the user's tables in learning_dir."""
+        from tic_tac_toe_learning import save_tables
+        save_tables()
+
+    def get_hint_move(self):
+        if not self.empty_indices():
+            return None
+        return self.minimax_ai()
@@ -0,0 +1,254 @@
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from tic_tac_toe_engine import TicTacToeEngine, ZOBRIST, EMPTY_HASHES, canonical_hash
+from tic_tac_toe_book import SortedKeyFile, write_sorted_key_file
+
+"""
+Self-play reinforcement learning for the Learning personality.
+
+Tabular TD(0) over afterstates: every canonical position is valued from the point of
+view of the player who just moved into it, as the expected result (1 win, 0.5 draw,
+0 loss). A player picks the move whose afterstate has the highest value, so playing
+costs one table lookup per empty cell.
+
+Values persist in a sorted binary file (a SortedKeyFile of (key, float32) records)
+that is memory-mapped on first use. The trained file shipped with the game is only
+read by players: games learned from during a session are kept in memory and save()
+merges them into a separate user file, which is looked up before the shipped one.
+
+Training plays batches of headless self-play games in a worker pool against the
+values saved after the previous batch, then applies the TD updates in order.
+
+Usage:
+    python tic_tac_toe_learning.py --size 3 --games 50000
+
+Author: Jeremiah Ddumba
+"""
+
+LEARNING_DIR = os.path.dirname(os.path.abspath(__file__))
+VALUE_FORMAT = 'f'
+# Value of a position the table has never seen
+DEFAULT_VALUE = 0.5
+LEARNING_RATE = 0.1
+# Chance of a random move during self-play
+EXPLORATION = 0.1
+
+
+class LearningTable:
+    """Afterstate values keyed by canonical position hash, read lazily from a file.
+
+    With a user_path, the file at path is read-only and save() writes to user_path.
+    """
+    def __init__(self, path, user_path=None):
+        self.path = path
+        self.user_path = user_path
+        self.stored = None
+        self.user_stored = None
+        self.updates = {}
+
+    def stored_values(self):
+        if self.stored is None and os.path.exists(self.path):
+            self.stored = SortedKeyFile(self.path, VALUE_FORMAT)
+        return self.stored
+
+    def user_values(self):
+        if self.user_stored is None and self.user_path is not None and os.path.exists(self.user_path):
+            self.user_stored = SortedKeyFile(self.user_path, VALUE_FORMAT)
+        return self.user_stored
+
+    def get(self, key, default=None):
+        if key in self.updates:
+            return self.updates[key]
+        for stored in (self.user_values(), self.stored_values()):
+            if stored is not None:
+                value = stored.get(key)
+                if value is not None:
+                    return value[0]
+        return default
+
+    def learn(self, keys, reward, learning_rate=LEARNING_RATE):
+        """TD(0) along one player's afterstates of a game, ending with the game's reward."""
+        for i, key in enumerate(keys):
+            target = self.get(keys[i + 1], DEFAULT_VALUE) if i + 1 < len(keys) else reward
+            value = self.get(key, DEFAULT_VALUE)
+            self.updates[key] = value + learning_rate * (target - value)
+
+    def learn_game(self, board_size, moves, winner, learning_rate=LEARNING_RATE):
+        """Update from a finished game given as its move indices (X first) and winner ('X', 'O' or '')."""
+        for player, keys in game_afterstates(board_size, moves).items():
+            reward = 0.5 if winner == '' else 1.0 if winner == player else 0.0
+            self.learn(keys, reward, learning_rate)
+
+    def save(self):
+        """Merge the in-memory updates into the user file, or into the file itself without one."""
+        if not self.updates:
+            return
+        if self.user_path is not None:
+            path, stored = self.user_path, self.user_values()
+        else:
+            path, stored = self.path, self.stored_values()
+        records = dict(stored.items()) if stored is not None else {}
+        records.update((key, (value,)) for key, value in self.updates.items())
+        if stored is not None:
+            stored.close()
+        write_sorted_key_file(path, records, VALUE_FORMAT)
+        if self.user_path is not None:
+            self.user_stored = None
+        else:
+            self.stored = None
+        self.updates = {}
+
+    def __len__(self):
+        keys = set(self.updates)
+        for stored in (self.user_values(), self.stored_values()):
+            if stored is not None:
+                keys.update(key for key, _ in stored.items())
+        return len(keys)
+
+
+def learning_path(board_size, misere_mode=False):
+    suffix = '_misere' if misere_mode else ''
+    return os.path.join(LEARNING_DIR, f'learning_{board_size}x{board_size}{suffix}.bin')
+
+
+def user_learning_path(directory, board_size, misere_mode=False):
+    """A player's own learned values, kept apart from the shipped table (which may share the directory)."""
+    suffix = '_misere' if misere_mode else ''
+    return os.path.join(directory, f'user_learning_{board_size}x{board_size}{suffix}.bin')
+
+
+# One table per configuration and user directory, shared by every engine in the process
+_tables = {}
+
+
+def learning_table(board_size, misere_mode=False, user_dir=None):
+    """The shared table for this configuration; without a user_dir session updates are never saved."""
+    key = (board_size, misere_mode, user_dir)
+    if key not in _tables:
+        user_path = user_learning_path(user_dir, board_size, misere_mode) if user_dir is not None else None
+        _tables[key] = LearningTable(learning_path(board_size, misere_mode), user_path)
+    return _tables[key]
+
+
+def save_tables():
+    """Write the session's updates of every loaded table to its user file."""
+    for table in _tables.values():
+        if table.user_path is None:
+            continue
+        try:
+            table.save()
+        except (IOError, OSError) as e:
+            print("Error saving learned values:", e)
+
+
+def game_afterstates(board_size, moves):
+    """Canonical keys of the positions each player moved into, in order."""
+    keys = {'X': [], 'O': []}
+    hashes = EMPTY_HASHES
+    player = 'X'
+    for index in moves:
+        hashes = tuple(h ^ z for h, z in zip(hashes, ZOBRIST[board_size][player][index]))
+        keys[player].append(canonical_hash(hashes))
+        player = 'O' if player == 'X' else 'X'
+    return keys
+
+
+def greedy_move(table, board_size, hashes, player, empty_indices):
+    """Empty cell whose afterstate has the highest learned value, or None if none has been seen."""
+    zobrist = ZOBRIST[board_size][player]
+    best_move = None
+    best_value = None
+    seen = False
+    for i in empty_indices:
+        value = table.get(canonical_hash(tuple(h ^ z for h, z in zip(hashes, zobrist[i]))))
+        if value is None:
+            value = DEFAULT_VALUE
+        else:
+            seen = True
+        if best_value is None or value > best_value:
+            best_move, best_value = i, value
+    return best_move if seen else None
+
+
+# --- Self-Play Training ---
+def play_games(task):
+    """Worker task: play games against the saved table. Returns a list of (moves, winner)."""
+    board_size, misere_mode, games, exploration, seed = task
+    rng = random.Random(seed)
+    # A fresh table view, so the values saved after the previous batch are used
+    table = LearningTable(learning_path(board_size, misere_mode))
+    # Only the rules are used, so keep the unused transposition table minimal
+    rules = TicTacToeEngine(board_size, misere_mode, tt_memory=0)
+    results = []
+    for _ in range(games):
+        rules.reset()
+        moves = []
+        winner = ''
+        while True:
+            empty_indices = rules.empty_indices()
+            move = None
+            if rng.random() >= exploration:
+                move = greedy_move(table, board_size, rules.hashes, rules.current_player, empty_indices)
+            if move is None:
+                move = rng.choice(empty_indices)
+            rules.place(move)
+            moves.append(move)
+            player = rules.current_player
+            if rules.last_move_wins():
+                winner = player
+                break
+            if rules.is_full():
+                break
+            rules.switch_turns()
+        results.append((moves, winner))
+    return results
+
+
+def train(board_size=3, misere_mode=False, games=50000, batch_games=1000, workers=None, seed=0,
+          exploration=EXPLORATION, learning_rate=LEARNING_RATE):
+    """Self-play games in batches of batch_games, saving the table after every batch."""
+    # Training writes the shipped table itself
+    table = LearningTable(learning_path(board_size, misere_mode))
+    workers = workers or os.cpu_count()
+    played = 0
+    with ProcessPoolExecutor(workers) as executor:
+        while played < games:
+            batch = min(batch_games, games - played)
+            per_task = -(-batch // workers)
+            tasks = [(board_size, misere_mode, min(per_task, batch - w * per_task), exploration,
+                      seed * 1000003 + played + w)
+                     for w in range(workers) if batch - w * per_task > 0]
+            wins = {'X': 0, 'O': 0, '': 0}
+            for results in executor.map(play_games, tasks):
+                for moves, winner in results:
+                    table.learn_game(board_size, moves, winner, learning_rate)
+                    wins[winner] += 1
+            table.save()
+            played += batch
+            print(f"{played} games: X {wins['X']}, O {wins['O']}, draws {wins['']}, {len(table)} positions")
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the Learning personality by self-play")
+    parser.add_argument('--size', type=int, default=3, choices=[3, 4, 5])
+    parser.add_argument('--misere', action='store_true')
+    parser.add_argument('--games', type=int, default=50000)
+    parser.add_argument('--batch', type=int, default=1000, help="games played between table updates")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--exploration', type=float, default=EXPLORATION)
+    parser.add_argument('--learning-rate', type=float, default=LEARNING_RATE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    train(args.size, args.misere, args.games, args.batch, args.workers, args.seed,
+          args.exploration, args.learning_rate)
+    print(f"Trained in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
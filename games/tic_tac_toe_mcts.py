@@ -0,0 +1,160 @@
+import math
+import time
+import numpy as np
+from tic_tac_toe_batch import has_line
+
+"""
+Monte Carlo Tree Search personality for the Tic-Tac-Toe engine.
+
+UCT selection over a tree of positions; every expanded leaf is scored by a batch of
+random playouts that are simulated together as NumPy arrays, one vectorized step per
+ply. The tree is kept between moves, so the subtree under the position reached after
+both sides have moved is reused instead of rebuilt.
+
+Author: Jeremiah Ddumba
+"""
+
+# Exploration constant for UCT
+UCT_C = 1.4
+
+
+def random_playouts(board_size, misere_mode, x_mask, o_mask, player, count, rng, win_length=None):
+    """
+    Play count random games to the end from one position, all at once.
+    Returns (x_wins, o_wins, draws). Terminal rules match TicTacToeEngine.mask_wins,
+    including its misère behaviour.
+    """
+    cells = board_size * board_size
+    board = np.zeros(cells, dtype=np.int8)
+    for i in range(cells):
+        if x_mask >> i & 1:
+            board[i] = 1
+        elif o_mask >> i & 1:
+            board[i] = -1
+    empty = np.flatnonzero(board == 0)
+    boards = np.repeat(board[None, :], count, axis=0)
+    # Row r fills the empty cells in a random order
+    order = empty[np.argsort(rng.random((count, len(empty))), axis=1)]
+    rows = np.arange(count)
+    winner = np.zeros(count, dtype=np.int8)
+    done = np.zeros(count, dtype=bool)
+    value = 1 if player == 'X' else -1
+    for step in range(len(empty)):
+        # Finished games keep receiving stones, but only their first terminal ply is recorded
+        boards[rows, order[:, step]] = value
+        won = has_line(boards, board_size, value, win_length)
+        terminal = ~won if misere_mode else won
+        new = terminal & ~done
+        winner[new] = value
+        done |= new
+        if done.all():
+            break
+        value = -value
+    return int((winner == 1).sum()), int((winner == -1).sum()), int((winner == 0).sum())
+
+
+class MCTSNode:
+    __slots__ = ('x_mask', 'o_mask', 'player', 'move', 'parent', 'children', 'untried',
+                 'visits', 'wins', 'winner')
+
+    def __init__(self, x_mask, o_mask, player, move=None, parent=None, winner=None, untried=()):
+        self.x_mask = x_mask
+        self.o_mask = o_mask
+        self.player = player        # side to move in this position
+        self.move = move            # move that led here from parent
+        self.parent = parent
+        self.children = {}
+        self.untried = list(untried)
+        self.visits = 0
+        self.wins = 0.0             # from the point of view of the player who made self.move
+        self.winner = winner        # None (not over), 'X', 'O' or '' for a draw
+
+
+class MonteCarloTreeSearch:
+    def __init__(self, board_size, misere_mode=False, win_length=None, batch_size=64, seed=None):
+        self.board_size = board_size
+        self.misere_mode = misere_mode
+        self.win_length = win_length or board_size
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        self.root = None
+
+    def make_node(self, engine, x_mask, o_mask, player, move=None, parent=None):
+        occupied = x_mask | o_mask
+        winner = None
+        if parent is not None:
+            mover = parent.player
+            if engine.mask_wins_at(x_mask if mover == 'X' else o_mask, occupied, move):
+                winner = mover
+            elif occupied == engine.full_mask:
+                winner = ''
+        untried = [] if winner is not None else \
+            [i for i in range(self.board_size * self.board_size) if not occupied >> i & 1]
+        return MCTSNode(x_mask, o_mask, player, move, parent, winner, untried)
+
+    def find_root(self, engine):
+        """Reuse the stored tree if the current position is its root, a child or a grandchild."""
+        x_mask, o_mask = engine.masks['X'], engine.masks['O']
+        candidates = []
+        if self.root is not None:
+            candidates.append(self.root)
+            for child in self.root.children.values():
+                candidates.append(child)
+                candidates.extend(child.children.values())
+        for node in candidates:
+            if node.x_mask == x_mask and node.o_mask == o_mask and node.player == engine.current_player:
+                node.parent = None
+                return node
+        return self.make_node(engine, x_mask, o_mask, engine.current_player)
+
+    def select_child(self, node):
+        log_visits = math.log(node.visits)
+        return max(node.children.values(),
+                   key=lambda c: c.wins / c.visits + UCT_C * math.sqrt(log_visits / c.visits))
+
+    def search(self, engine, playouts, time_budget=None):
+        """Run up to playouts random games (or until time_budget seconds pass) and return the best move."""
+        root = self.find_root(engine)
+        deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        done = 0
+        while done < playouts and not engine.stop_requested:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            node = root
+            # Selection
+            while not node.untried and node.children:
+                node = self.select_child(node)
+            # Expansion
+            if node.untried:
+                move = node.untried.pop(int(self.rng.integers(len(node.untried))))
+                bit = 1 << move
+                x_mask = node.x_mask | bit if node.player == 'X' else node.x_mask
+                o_mask = node.o_mask | bit if node.player == 'O' else node.o_mask
+                child = self.make_node(engine, x_mask, o_mask, engine.switch_player(node.player), move, node)
+                node.children[move] = child
+                node = child
+            # Simulation
+            count = self.batch_size
+            if node.winner is None:
+                x_wins, o_wins, draws = random_playouts(self.board_size, self.misere_mode, node.x_mask,
+                                                        node.o_mask, node.player, count, self.rng,
+                                                        self.win_length)
+            else:
+                x_wins = count if node.winner == 'X' else 0
+                o_wins = count if node.winner == 'O' else 0
+                draws = count if node.winner == '' else 0
+            # Backpropagation
+            while node is not None:
+                mover = engine.switch_player(node.player)
+                node.visits += count
+                node.wins += (x_wins if mover == 'X' else o_wins) + 0.5 * draws
+                node = node.parent
+            done += count
+
+        engine.search_nodes = done
+        if not root.children:
+            return root.untried[0] if root.untried else None
+        best = max(root.children.values(), key=lambda c: c.visits)
+        # Keep the subtree under our move; the opponent's reply will be one of its children
+        self.root = best
+        return best.move
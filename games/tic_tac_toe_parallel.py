@@ -0,0 +1,195 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from tic_tac_toe_engine import TicTacToeEngine, SearchTimeout, ZOBRIST, WIN_SCORE
+
+"""
+Root-parallel minimax for the Tic-Tac-Toe engine.
+
+Each iterative-deepening iteration deals the root moves round-robin to a pool of
+worker processes. Workers keep one engine (and so one transposition table) per
+board configuration alive between tasks, and share the best root score found so
+far through a shared-memory alpha bound so that every worker prunes against it.
+A shared stop flag lets engine.request_stop() reach searches running in the workers.
+
+The pool is started with fork where available. fork copies only the calling thread,
+so the pool must be started before the process starts any other threads. Root-parallel
+search is therefore for headless callers only (the engine API, the benchmarks and
+tournaments): the pygame UI searches on threads and always uses a single worker.
+
+Author: Jeremiah Ddumba
+"""
+
+# Per-process worker state, set up by _init_worker
+_shared_alpha = None
+_shared_stop = None
+_worker_engines = {}
+
+# Pools are expensive to start, so keep one per worker count
+_executors = {}
+
+
+def _init_worker(shared_alpha, shared_stop):
+    global _shared_alpha, _shared_stop
+    _shared_alpha = shared_alpha
+    _shared_stop = shared_stop
+
+
+class _StopFlag:
+    """Stands in for a worker engine's stop_requested: true once the parent asks its search to stop."""
+    def __bool__(self):
+        return bool(_shared_stop.value)
+
+
+def _worker_engine(board_size, misere_mode, win_length):
+    """Engine that lives as long as the worker process, so its transposition table carries over."""
+    key = (board_size, misere_mode, win_length)
+    if key not in _worker_engines:
+        engine = TicTacToeEngine(board_size, misere_mode)
+        engine.set_board_size(board_size, win_length)
+        engine.stop_requested = _StopFlag()
+        _worker_engines[key] = engine
+    return _worker_engines[key]
+
+
+def _search_moves(board, current_player, board_size, misere_mode, win_length, search_algorithm, moves, depth,
+                  time_budget, node_budget):
+    """
+    Worker task: search a slice of the root moves at a fixed depth.
+    Returns (completed, best_move, best_score, nodes, pv). best_move is None when no move in
+    the slice beat the shared alpha, i.e. another worker already has a better one.
+    """
+    engine = _worker_engine(board_size, misere_mode, win_length)
+    engine.board = list(board)
+    engine.sync_masks()
+    engine.current_player = current_player
+    engine.search_algorithm = search_algorithm
+    engine.begin_search(time_budget, node_budget)
+    opponent = engine.switch_player(current_player)
+    masks = dict(engine.masks)
+    zobrist = ZOBRIST[board_size][current_player]
+    best_move = None
+    best_score = -float('inf')
+    try:
+        for i in moves:
+            alpha = max(best_score, _shared_alpha.value)
+            masks[current_player] |= 1 << i
+            hashes = tuple(h ^ z for h, z in zip(engine.hashes, zobrist[i]))
+            if search_algorithm == 'minimax':
+                score = engine.minimax(masks, opponent, False, depth - 1, alpha=alpha, hashes=hashes, last_move=i)
+            else:
+                score = -engine.negamax(masks, opponent, depth - 1, -float('inf'), -alpha, hashes, i)
+            masks[current_player] &= ~(1 << i)
+            # A score at or below alpha is only an upper bound, so it cannot be the best move
+            if score > alpha:
+                best_move, best_score = i, score
+                with _shared_alpha.get_lock():
+                    if score > _shared_alpha.value:
+                        _shared_alpha.value = score
+    except SearchTimeout:
+        return False, None, None, engine.search_nodes, []
+    finally:
+        engine.end_search()
+    # The line is in this worker's transposition table, so it is read back here
+    pv = engine.principal_variation(best_move, depth) if best_move is not None else []
+    return True, best_move, best_score, engine.search_nodes, pv
+
+
+def get_executor(workers):
+    """
+    Return the (executor, shared_alpha, shared_stop) triple for a pool of the given size,
+    starting it if needed. Start pools before the process starts any threads (see above).
+    """
+    if workers not in _executors:
+        # fork avoids re-importing the caller's __main__ (the pygame UI) in every worker
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        shared_alpha = context.Value('d', -float('inf'))
+        shared_stop = context.Value('b', 0)
+        executor = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                       initargs=(shared_alpha, shared_stop))
+        _executors[workers] = (executor, shared_alpha, shared_stop)
+    return _executors[workers]
+
+
+def shutdown_executors():
+    for executor, _, _ in _executors.values():
+        executor.shutdown(cancel_futures=True)
+    _executors.clear()
+
+
+# How often the parent checks engine.stop_requested while the workers search
+STOP_POLL_INTERVAL = 0.02
+
+
+def parallel_search(engine, workers, max_depth=None, time_budget=None, node_budget=None):
+    """
+    Iterative deepening with the root moves of each iteration split across worker processes.
+    Returns the best move of the deepest iteration that every worker completed, and leaves
+    the total node count, that depth, its score and its line in engine.search_nodes,
+    engine.search_depth, engine.search_score and engine.search_pv. Stops early when
+    engine.stop_requested is set.
+    """
+    if max_depth is None:
+        max_depth = engine.ai_depth
+    if time_budget is None:
+        time_budget = engine.time_budget
+    if node_budget is None:
+        node_budget = engine.node_budget
+    moves = engine.move_ordering.order(engine.empty_indices(), 0)
+    if not moves:
+        return None
+
+    executor, shared_alpha, shared_stop = get_executor(workers)
+    shared_stop.value = 0
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+    engine.search_nodes = 0
+    engine.search_depth = 0
+    engine.search_score = 0
+    engine.search_pv = []
+    best_move = moves[0]
+    for depth in range(1, min(max_depth, len(moves)) + 1):
+        if engine.stop_requested:
+            break
+        remaining = deadline - time.perf_counter() if deadline is not None else None
+        if remaining is not None and remaining <= 0:
+            break
+        # Previous best first, then deal the rest round-robin so every worker gets strong moves
+        ordered = [best_move] + [m for m in moves if m != best_move]
+        slices = [ordered[w::workers] for w in range(workers) if ordered[w::workers]]
+        # The node budget covers all iterations and is shared evenly by this iteration's workers
+        worker_nodes = None
+        if node_budget is not None:
+            if engine.search_nodes >= node_budget:
+                break
+            worker_nodes = max(1, (node_budget - engine.search_nodes) // len(slices))
+        shared_alpha.value = -float('inf')
+        futures = [executor.submit(_search_moves, engine.board, engine.current_player, engine.board_size,
+                                   engine.misere_mode, engine.win_length, engine.search_algorithm,
+                                   moves_slice, depth, remaining, worker_nodes)
+                   for moves_slice in slices]
+        pending = futures
+        while pending:
+            if engine.stop_requested:
+                shared_stop.value = 1
+                for future in pending:
+                    future.cancel()
+            _, pending = wait(pending, timeout=STOP_POLL_INTERVAL)
+        if engine.stop_requested:
+            engine.search_nodes += sum(future.result()[3] for future in futures if not future.cancelled())
+            break
+        results = [future.result() for future in futures]
+        engine.search_nodes += sum(nodes for _, _, _, nodes, _ in results)
+        if not all(completed for completed, _, _, _, _ in results):
+            break
+        candidates = [(score, ordered.index(move), move, pv) for _, move, score, _, pv in results if move is not None]
+        if not candidates:
+            break
+        # Highest score wins; ties go to the move that was ordered first
+        score, _, best_move, pv = max(candidates, key=lambda c: (c[0], -c[1]))
+        engine.search_depth = depth
+        engine.search_score = score
+        engine.search_pv = pv
+        if abs(score) >= WIN_SCORE:
+            break
+    return best_move
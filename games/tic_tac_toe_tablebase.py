@@ -0,0 +1,237 @@
+import argparse
+import mmap
+import os
+import time
+
+"""
+Complete endgame tablebase for small Tic-Tac-Toe boards, built by retrograde analysis.
+
+The builder enumerates every position reachable from the empty board, ply by ply,
+then walks the plies backwards labelling each non-terminal position as a win, loss
+or draw for the side to move together with its distance to the result in plies.
+Labels are packed two per byte, 4 bits each, in an array indexed by the base-3
+number of the board (cell i contributes 3**i for X, 2 * 3**i for O), so a lookup is
+one index computation and one byte read from the memory-mapped file.
+
+4-bit codes: 0 not stored (unreachable, terminal or full board), 1 draw,
+2..8 win in 1, 3, ..., 13 plies, 9..15 loss in 2, 4, ..., 14 plies.
+
+Only normal rules are tabled. Under this engine's misère rules any stone that completes
+no line ends the game, so the empty board would be the only undecided position: the
+table would be megabytes of terminal entries, and the search solves misère instantly.
+
+Usage:
+    python tic_tac_toe_tablebase.py --size 4
+
+Author: Jeremiah Ddumba
+"""
+
+TABLEBASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+# Longest distances a 4-bit code can hold
+MAX_WIN_DISTANCE = 13
+MAX_LOSS_DISTANCE = 14
+
+
+def build_ternary_tables(n):
+    """Per byte of a bitboard, the base-3 weight of every byte value: table[chunk][byte]."""
+    tables = []
+    for chunk in range(0, n * n, 8):
+        tables.append([sum(3 ** (chunk + j) for j in range(8) if byte >> j & 1 and chunk + j < n * n)
+                       for byte in range(256)])
+    return tables
+
+TERNARY_TABLES = {n: build_ternary_tables(n) for n in (3, 4)}
+
+
+def position_index(x_mask, o_mask, n):
+    """Perfect index of a position: its board read as a base-3 number."""
+    index = 0
+    for chunk, table in enumerate(TERNARY_TABLES[n]):
+        shift = chunk * 8
+        index += table[x_mask >> shift & 255] + 2 * table[o_mask >> shift & 255]
+    return index
+
+
+def decode(code):
+    """(result, distance) for a stored code, None for 0."""
+    if code == 0:
+        return None
+    elif code == 1:
+        return DRAW, 0
+    elif code <= 8:
+        return WIN, 2 * (code - 2) + 1
+    else:
+        return LOSS, 2 * (code - 8)
+
+
+class Tablebase:
+    """Read-only, memory-mapped view of a built tablebase file."""
+    def __init__(self, path, board_size):
+        self.board_size = board_size
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def probe(self, x_mask, o_mask):
+        """(result, distance) for the side to move, or None if the position is not stored."""
+        index = position_index(x_mask, o_mask, self.board_size)
+        byte = self.map[index >> 1]
+        return decode(byte >> 4 if index & 1 else byte & 15)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def tablebase_path(board_size):
+    return os.path.join(TABLEBASE_DIR, f'tablebase_{board_size}x{board_size}.bin')
+
+
+# Opened tablebases, and None for ones that have not been built, by (board_size, misere_mode)
+_tablebases = {}
+
+
+def tablebase(board_size, misere_mode=False):
+    """The memory-mapped tablebase for this configuration, or None if none has been built."""
+    # Misère is never tabled (see above)
+    if misere_mode:
+        return None
+    key = (board_size, misere_mode)
+    if key not in _tablebases:
+        path = tablebase_path(board_size)
+        _tablebases[key] = Tablebase(path, board_size) if os.path.exists(path) else None
+    return _tablebases[key]
+
+
+def tablebase_results(engine):
+    """
+    {move: (result, plies to the result)} for every empty cell, from the point of view of
+    engine.current_player. None if there is no tablebase or a position is not in it.
+    """
+    table = tablebase(engine.board_size, engine.misere_mode)
+    if table is None:
+        return None
+    player = engine.current_player
+    x_mask, o_mask = engine.masks['X'], engine.masks['O']
+    occupied = x_mask | o_mask
+    results = {}
+    for i in engine.empty_indices():
+        bit = 1 << i
+        child_x = x_mask | bit if player == 'X' else x_mask
+        child_o = o_mask | bit if player == 'O' else o_mask
+        if engine.mask_wins(child_x if player == 'X' else child_o, occupied | bit):
+            results[i] = (WIN, 1)
+        elif occupied | bit == engine.full_mask:
+            results[i] = (DRAW, 0)
+        else:
+            entry = table.probe(child_x, child_o)
+            if entry is None:
+                return None
+            # The child is stored from the opponent's point of view
+            result, distance = entry
+            results[i] = (-result, distance + 1) if result != DRAW else (DRAW, 0)
+    return results
+
+
+def tablebase_move(engine):
+    """
+    Best move for engine.current_player from the tablebase: the fastest win, else a
+    draw, else the slowest loss. None if there is no tablebase or the position is not in it.
+    """
+    results = tablebase_results(engine)
+    if not results:
+        return None
+    best_move = None
+    best_key = None
+    for i, (result, plies) in results.items():
+        key = 100 - plies if result == WIN else -100 + plies if result == LOSS else 0
+        if best_key is None or key > best_key:
+            best_move, best_key = i, key
+    return best_move
+
+
+# --- Builder ---
+def build_tablebase(board_size=4):
+    """
+    Solve every reachable position under normal rules. Returns a uint8 array of 4-bit codes,
+    one per base-3 index. Terminal rules match TicTacToeEngine.mask_wins.
+    """
+    # NumPy is only needed to build the table, not to read it
+    import numpy as np
+    from tic_tac_toe_batch import has_line
+
+    cells = board_size * board_size
+    powers = 3 ** np.arange(cells, dtype=np.int64)
+    # Working values per index from the side to move's point of view: +d win in d plies,
+    # -d loss in d plies, 0 draw; terminal_value marks positions the last mover has won
+    terminal_value = 127
+    values = np.zeros(3 ** cells, dtype=np.int8)
+
+    def digits(indices):
+        return (indices[:, None] // powers) % 3
+
+    # Forward pass: the reachable, non-terminal positions of every ply
+    layers = [np.zeros(1, dtype=np.int64)]
+    for ply in range(cells):
+        states = layers[-1]
+        empty = cells - ply
+        # Every position of a ply has the same number of empty cells, so the children form a matrix
+        empty_cells = np.nonzero(digits(states) == 0)[1].reshape(len(states), empty)
+        piece = 1 if ply % 2 == 0 else 2
+        children = np.unique(states[:, None] + piece * powers[empty_cells])
+        child_digits = digits(children)
+        boards = np.where(child_digits == 1, 1, np.where(child_digits == 2, -1, 0)).astype(np.int8)
+        terminal = has_line(boards, board_size, 1 if piece == 1 else -1)
+        values[children[terminal]] = terminal_value
+        layers.append(children[~terminal])
+        print(f"ply {ply + 1}: {len(children)} positions, {int(terminal.sum())} terminal")
+
+    # Backward pass: label each ply from the labels of the next one
+    for ply in range(cells - 1, -1, -1):
+        states = layers[ply]
+        if len(states) == 0:
+            continue
+        empty = cells - ply
+        piece = 1 if ply % 2 == 0 else 2
+        empty_cells = np.nonzero(digits(states) == 0)[1].reshape(len(states), empty)
+        child_values = values[states[:, None] + piece * powers[empty_cells]].astype(np.int16)
+        # Child values are from the opponent's point of view; shift them one ply and flip the sign
+        scores = np.where(child_values == terminal_value, 1,
+                          np.where(child_values > 0, -(child_values + 1),
+                                   np.where(child_values < 0, -child_values + 1, 0)))
+        # Prefer the fastest win, then a draw, then the slowest loss
+        preference = np.where(scores > 0, 100 - scores, np.where(scores < 0, -100 - scores, 0))
+        best = scores[np.arange(len(states)), preference.argmax(axis=1)]
+        values[states] = best
+
+    codes = np.zeros(3 ** cells + 1, dtype=np.uint8)
+    for ply in range(cells + 1):
+        states = layers[ply]
+        labels = values[states].astype(np.int16)
+        if (labels > MAX_WIN_DISTANCE).any() or (labels < -MAX_LOSS_DISTANCE).any():
+            raise ValueError("Distance to result does not fit in a 4-bit code")
+        codes[states] = np.where(labels > 0, 2 + (labels - 1) // 2,
+                                 np.where(labels < 0, 8 + -labels // 2, 1))
+    return (codes[0::2] | codes[1::2] << 4).astype(np.uint8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a Tic-Tac-Toe tablebase by retrograde analysis")
+    parser.add_argument('--size', type=int, default=4, choices=[3, 4])
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    packed = build_tablebase(args.size)
+    path = tablebase_path(args.size)
+    temp_path = path + '.tmp'
+    packed.tofile(temp_path)
+    os.replace(temp_path, path)
+    print(f"Wrote {len(packed)} bytes to {path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
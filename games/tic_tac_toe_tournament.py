@@ -0,0 +1,162 @@
+import argparse
+import itertools
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from tic_tac_toe_engine import TicTacToeEngine
+
+"""
+Headless AI-vs-AI tournament runner.
+
+Plays many games between every ordered pair of AI players on each board size, with
+no pygame and no animation delays, spread over a process pool. Every game gets its
+own seed derived from --seed, so a run can be repeated exactly; use --node-budget
+instead of the time budget when results must not depend on machine speed.
+
+A player is written as Difficulty[:Personality], e.g. Easy, Medium, Hard:Balanced,
+Hard:MCTS.
+
+Usage:
+    python tic_tac_toe_tournament.py --players Easy Medium Hard:Balanced Hard:MCTS --sizes 3 4 --games 200
+
+Author: Jeremiah Ddumba
+"""
+
+
+def parse_player(spec):
+    difficulty, _, personality = spec.partition(':')
+    return difficulty, personality or 'Balanced'
+
+
+def make_engine(spec, board_size, misere_mode, seed, time_budget, node_budget, precomputed=False):
+    engine = TicTacToeEngine(board_size, misere_mode)
+    # Locally built tablebases and books would make results depend on which files exist
+    engine.use_tablebase = engine.use_opening_book = precomputed
+    engine.difficulty, engine.ai_personality = parse_player(spec)
+    engine.time_budget = time_budget
+    engine.node_budget = node_budget
+    if engine.ai_personality == 'MCTS':
+        from tic_tac_toe_mcts import MonteCarloTreeSearch
+        engine.mcts = MonteCarloTreeSearch(board_size, misere_mode, seed=seed)
+        if node_budget is not None:
+            engine.mcts_playouts = node_budget
+    return engine
+
+
+def play_game(task):
+    """
+    Play one game; runs inside a worker process.
+    Returns the winner ('X', 'O' or '' for a draw) and per-side move counts, time and nodes.
+    """
+    board_size, misere_mode, x_spec, o_spec, seed, time_budget, node_budget, precomputed = task
+    random.seed(seed)
+    engines = {
+        'X': make_engine(x_spec, board_size, misere_mode, seed, time_budget, node_budget, precomputed),
+        'O': make_engine(o_spec, board_size, misere_mode, seed + 1, time_budget, node_budget, precomputed),
+    }
+    stats = {p: {'moves': 0, 'seconds': 0.0, 'nodes': 0} for p in ('X', 'O')}
+    player = 'X'
+    winner = ''
+    while True:
+        engine = engines[player]
+        engine.search_nodes = 0
+        start = time.perf_counter()
+        index = engine.choose_move()
+        stats[player]['seconds'] += time.perf_counter() - start
+        stats[player]['nodes'] += engine.search_nodes
+        stats[player]['moves'] += 1
+        # Both engines track the board so each keeps its own search state
+        for e in engines.values():
+            e.place(index)
+        if engine.last_move_wins():
+            winner = player
+            break
+        if engine.is_full():
+            break
+        for e in engines.values():
+            e.switch_turns()
+        player = engine.current_player
+    return winner, stats
+
+
+def run_tournament(players, sizes, games, seed=0, workers=None, misere_mode=False,
+                   time_budget=0.05, node_budget=None, precomputed=False):
+    """Play games per ordered pairing per board size. Returns a list of result records."""
+    tasks = []
+    keys = []
+    for board_size in sizes:
+        for x_spec, o_spec in itertools.permutations(players, 2):
+            for game in range(games):
+                game_seed = seed * 1000003 + len(tasks) * 2
+                tasks.append((board_size, misere_mode, x_spec, o_spec, game_seed, time_budget, node_budget,
+                              precomputed))
+                keys.append((board_size, x_spec, o_spec))
+
+    records = {}
+    with ProcessPoolExecutor(workers) as executor:
+        for key, (winner, stats) in zip(keys, executor.map(play_game, tasks, chunksize=8)):
+            board_size, x_spec, o_spec = key
+            record = records.setdefault(key, {
+                'board_size': board_size, 'x': x_spec, 'o': o_spec,
+                'x_wins': 0, 'draws': 0, 'o_wins': 0,
+                'x_moves': 0, 'x_seconds': 0.0, 'x_nodes': 0,
+                'o_moves': 0, 'o_seconds': 0.0, 'o_nodes': 0,
+            })
+            if winner == 'X':
+                record['x_wins'] += 1
+            elif winner == 'O':
+                record['o_wins'] += 1
+            else:
+                record['draws'] += 1
+            for side in ('x', 'o'):
+                side_stats = stats[side.upper()]
+                record[f'{side}_moves'] += side_stats['moves']
+                record[f'{side}_seconds'] += side_stats['seconds']
+                record[f'{side}_nodes'] += side_stats['nodes']
+    return list(records.values())
+
+
+def print_report(records):
+    print(f"{'size':<5} {'X player':<16} {'O player':<16} {'X win':>6} {'draw':>6} {'O win':>6}"
+          f" {'X ms/move':>10} {'O ms/move':>10} {'X nodes':>9} {'O nodes':>9}")
+    for r in records:
+        x_moves = max(r['x_moves'], 1)
+        o_moves = max(r['o_moves'], 1)
+        print(f"{r['board_size']}x{r['board_size']:<3} {r['x']:<16} {r['o']:<16} {r['x_wins']:>6} {r['draws']:>6}"
+              f" {r['o_wins']:>6} {1000 * r['x_seconds'] / x_moves:>10.2f} {1000 * r['o_seconds'] / o_moves:>10.2f}"
+              f" {r['x_nodes'] / x_moves:>9.0f} {r['o_nodes'] / o_moves:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Tic-Tac-Toe AI tournament")
+    parser.add_argument('--players', nargs='+', default=['Easy', 'Medium', 'Hard:Balanced'],
+                        help="Difficulty[:Personality] for each entrant")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[3], choices=[3, 4, 5])
+    parser.add_argument('--games', type=int, default=100, help="games per ordered pairing and board size")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--misere', action='store_true')
+    parser.add_argument('--time-budget', type=float, default=0.05, help="seconds per search move")
+    parser.add_argument('--node-budget', type=int, default=None,
+                        help="nodes (or MCTS playouts) per move instead of --time-budget; makes results reproducible")
+    parser.add_argument('--precomputed', action='store_true',
+                        help="let engines use locally built tablebases and opening books")
+    parser.add_argument('--json', help="also write the result records to this file")
+    args = parser.parse_args()
+
+    # A node budget replaces the clock entirely so that results are reproducible
+    time_budget = None if args.node_budget is not None else args.time_budget
+    start = time.perf_counter()
+    records = run_tournament(args.players, args.sizes, args.games, args.seed, args.workers,
+                             args.misere, time_budget, args.node_budget, args.precomputed)
+    print_report(records)
+    print(f"Played {sum(r['x_wins'] + r['draws'] + r['o_wins'] for r in records)} games"
+          f" in {time.perf_counter() - start:.1f}s")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(records, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()